@@ -2,7 +2,8 @@ const API_BASE = 'http://192.168.0.254:8000';
 let accounts = [];
 let pendingUsers = [];
 let deletingId = null;
-let onlineUsersInterval = null;
+let onlineUsersStream = null;
+let onlineUsersRetryTimer = null;
 let onlineUsersData = null;
 
 document.addEventListener('DOMContentLoaded', () => {
@@ -33,8 +34,7 @@ async function checkAuth() {
         }
         loadAccounts();
         loadPendingUsers();
-        loadOnlineUsers();
-        onlineUsersInterval = setInterval(loadOnlineUsers, 1000);
+        startOnlineUsersStream();
     } catch {
         localStorage.removeItem('access_token');
         window.location.href = 'login.html';
@@ -361,31 +361,90 @@ async function confirmLogout() {
     }, 800);
 }
 
-async function loadOnlineUsers() {
+async function startOnlineUsersStream() {
     const token = getToken();
+    onlineUsersStream = new AbortController();
     try {
-        const res = await fetch(`${API_BASE}/api/admin/online-users`, {
-            headers: { 'Authorization': `Bearer ${token}` }
+        const res = await fetch(`${API_BASE}/api/admin/online-users/stream`, {
+            headers: { 'Authorization': `Bearer ${token}` },
+            signal: onlineUsersStream.signal
         });
-        if (!res.ok) throw new Error();
-        onlineUsersData = await res.json();
+        if (!res.ok) throw new Error(`API 요청 실패: ${res.status}`);
 
-        const countEl = document.getElementById('onlineUserCount');
-        if (countEl) {
-            countEl.textContent = onlineUsersData.count;
+        const reader = res.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
+
+        while (true) {
+            const { done, value } = await reader.read();
+            if (done) break;
+
+            buffer += decoder.decode(value, { stream: true });
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+
+            for (const line of lines) {
+                if (!line.startsWith('data: ')) continue;
+                try {
+                    applyOnlineUsersEvent(JSON.parse(line.slice(6)));
+                } catch {}
+            }
         }
     } catch (e) {
-        console.error('접속자 수 로드 실패:', e);
+        if (e.name === 'AbortError') return;
+        console.error('접속자 스트림 오류:', e);
         const countEl = document.getElementById('onlineUserCount');
         if (countEl) {
             countEl.textContent = '-';
         }
     }
+
+    // 서버 재시작 등으로 끊기면 재연결 (재연결 시 snapshot부터 다시 수신)
+    onlineUsersRetryTimer = setTimeout(startOnlineUsersStream, 3000);
+}
+
+function applyOnlineUsersEvent(event) {
+    if (event.type === 'snapshot') {
+        onlineUsersData = { count: event.count, users: event.users };
+    } else if (event.type === 'join') {
+        const users = onlineUsersData.users.filter(u => u.id !== event.user.id);
+        onlineUsersData = { count: event.count, users: [event.user, ...users] };
+    } else if (event.type === 'leave') {
+        const users = onlineUsersData.users.filter(u => u.id !== event.user_id);
+        onlineUsersData = { count: event.count, users };
+    } else if (event.type === 'seen') {
+        // 주기적으로 오는 마지막 활동 시각 갱신
+        const seen = new Map(event.users.map(u => [u.id, u.last_heartbeat]));
+        onlineUsersData.users = onlineUsersData.users
+            .map(u => seen.has(u.id) ? { ...u, last_heartbeat: seen.get(u.id) } : u)
+            .sort((a, b) => new Date(b.last_heartbeat) - new Date(a.last_heartbeat));
+    } else {
+        return;
+    }
+
+    const countEl = document.getElementById('onlineUserCount');
+    if (countEl) {
+        countEl.textContent = onlineUsersData.count;
+    }
+    // 모달이 열려 있으면 join/leave/seen 모두 바로 반영
+    if (isOnlineUsersModalOpen()) {
+        renderOnlineUsersList();
+    }
+}
+
+function isOnlineUsersModalOpen() {
+    return document.getElementById('modalOverlay').style.display === 'flex'
+        && document.getElementById('onlineUsersContent').style.display === 'block';
 }
 
 function showOnlineUsersModal() {
     if (!onlineUsersData || !onlineUsersData.users) return;
 
+    renderOnlineUsersList();
+    showModal('onlineUsersContent');
+}
+
+function renderOnlineUsersList() {
     const listEl = document.getElementById('onlineUsersList');
     if (!listEl) return;
 
@@ -410,12 +469,13 @@ function showOnlineUsersModal() {
             `;
         }).join('');
     }
-
-    showModal('onlineUsersContent');
 }
 
 window.addEventListener('beforeunload', () => {
-    if (onlineUsersInterval) {
-        clearInterval(onlineUsersInterval);
+    if (onlineUsersRetryTimer) {
+        clearTimeout(onlineUsersRetryTimer);
+    }
+    if (onlineUsersStream) {
+        onlineUsersStream.abort();
     }
 });
@@ -1,49 +1,58 @@
 const API_BASE = 'http://192.168.0.254:8000';
 
-let chatIdCounter = 1;
-let currentChatId = '1';
-let chats = {
-    '1': { title: '새 대화', messages: [] }
-};
+// 대화는 서버에 저장되고, 첫 메시지를 보낼 때 생성됨 (currentChatId === null: 새 대화)
+let currentChatId = null;
+let chats = [];
 let currentUser = null;
 
+function authHeaders() {
+    return { 'Authorization': `Bearer ${localStorage.getItem('access_token')}` };
+}
+
+function findChat(chatId) {
+    return chats.find(c => c.id === chatId);
+}
+
 function createNewChat() {
-    chatIdCounter++;
-    const newId = String(chatIdCounter);
-    chats[newId] = { title: '새 대화', messages: [] };
-    currentChatId = newId;
+    currentChatId = null;
     renderChatHistory();
     clearMessages();
     document.getElementById('welcomeScreen').classList.remove('hidden');
     document.getElementById('messageInput').focus();
-    saveChats();
 }
 
-function selectChat(chatId) {
+async function selectChat(chatId) {
     currentChatId = chatId;
     renderChatHistory();
-    renderMessages();
+    await loadMessages(chatId);
+    if (currentChatId === chatId) renderMessages();
 }
 
-function deleteChat(event, chatId) {
+async function deleteChat(event, chatId) {
     event.stopPropagation();
-    delete chats[chatId];
-    if (Object.keys(chats).length === 0) {
+    try {
+        const res = await fetch(`${API_BASE}/api/ai/conversations/${chatId}`, {
+            method: 'DELETE',
+            headers: authHeaders()
+        });
+        if (!res.ok && res.status !== 404) throw new Error(`API 요청 실패: ${res.status}`);
+    } catch (e) {
+        console.error('대화 삭제 실패:', e);
+        return;
+    }
+    chats = chats.filter(c => c.id !== chatId);
+    if (currentChatId === chatId) {
         createNewChat();
-    } else if (currentChatId === chatId) {
-        currentChatId = Object.keys(chats)[0];
+    } else {
+        renderChatHistory();
     }
-    renderChatHistory();
-    renderMessages();
-    saveChats();
 }
 
 function renderChatHistory() {
     const container = document.getElementById('chatHistory');
-    const ids = Object.keys(chats).reverse();
     let html = '<div class="history-section"><div class="history-label">대화 목록</div>';
-    ids.forEach(id => {
-        const chat = chats[id];
+    chats.forEach(chat => {
+        const id = chat.id;
         const activeClass = id === currentChatId ? 'active' : '';
         html += `
             <div class="history-item ${activeClass}" data-id="${id}" onclick="selectChat('${id}')">
@@ -63,7 +72,7 @@ function clearMessages() {
 function renderMessages() {
     const container = document.getElementById('messagesContainer');
     const welcome = document.getElementById('welcomeScreen');
-    const messages = chats[currentChatId]?.messages || [];
+    const messages = findChat(currentChatId)?.messages || [];
 
     if (messages.length === 0) {
         welcome.classList.remove('hidden');
@@ -100,13 +109,14 @@ function escapeHtml(text) {
     return div.innerHTML.replace(/\n/g, '<br>');
 }
 
-function addMessage(role, content) {
-    chats[currentChatId].messages.push({ role, content });
-    if (role === 'user' && chats[currentChatId].messages.length === 1) {
-        chats[currentChatId].title = content.substring(0, 30) + (content.length > 30 ? '...' : '');
+function addMessage(role, content, chatId = currentChatId) {
+    const chat = findChat(chatId);
+    if (!chat) return;
+    chat.messages.push({ role, content });
+    if (role === 'user' && chat.messages.length === 1) {
+        chat.title = content.substring(0, 30) + (content.length > 30 ? '...' : '');
         renderChatHistory();
     }
-    saveChats();
 }
 
 function showTypingIndicator() {
@@ -140,9 +150,17 @@ function scrollToBottom() {
 let isStreaming = false;
 let abortController = null;
 
-function buildHistory() {
-    const msgs = chats[currentChatId]?.messages || [];
-    return msgs.map(m => ({ role: m.role === 'ai' ? 'assistant' : m.role, content: m.content }));
+async function createConversation() {
+    const res = await fetch(`${API_BASE}/api/ai/conversations`, {
+        method: 'POST',
+        headers: { ...authHeaders(), 'Content-Type': 'application/json' },
+        body: JSON.stringify({})
+    });
+    if (!res.ok) throw new Error(`API 요청 실패: ${res.status}`);
+    const data = await res.json();
+    const chat = { id: data.id, title: data.title, messages: [], loaded: true };
+    chats.unshift(chat);
+    return chat;
 }
 
 function createStreamingMessageEl() {
@@ -230,6 +248,17 @@ async function sendMessage() {
     }
     console.log('[AI] sendMessage 시작');
 
+    if (!currentChatId) {
+        try {
+            currentChatId = (await createConversation()).id;
+        } catch (e) {
+            console.error('대화 생성 실패:', e);
+            return;
+        }
+        renderChatHistory();
+    }
+    const chatId = currentChatId;
+
     document.getElementById('welcomeScreen').classList.add('hidden');
 
     addMessage('user', content);
@@ -240,8 +269,6 @@ async function sendMessage() {
     input.value = '';
     input.style.height = 'auto';
 
-    const history = buildHistory();
-
     isStreaming = true;
     toggleSendButton(true);
     createStreamingMessageEl();
@@ -260,7 +287,7 @@ async function sendMessage() {
                 'Content-Type': 'application/json',
                 'Authorization': `Bearer ${token}`
             },
-            body: JSON.stringify({ message: content, history }),
+            body: JSON.stringify({ message: content, conversation_id: chatId }),
             signal: abortController.signal
         });
 
@@ -328,7 +355,7 @@ async function sendMessage() {
     if (streamEl) streamEl.removeAttribute('id');
 
     if (fullResponse) {
-        addMessage('ai', fullResponse);
+        addMessage('ai', fullResponse, chatId);
     }
     isStreaming = false;
     abortController = null;
@@ -371,9 +398,12 @@ async function loadUser() {
         }
 
         currentUser = await res.json();
-        loadChats();
-        renderChatHistory();
-        renderMessages();
+        await loadChats();
+        if (chats.length > 0) {
+            await selectChat(chats[0].id);
+        } else {
+            createNewChat();
+        }
         messageInput.focus();
     } catch (e) {
         console.error('사용자 정보 로드 실패:', e);
@@ -381,30 +411,28 @@ async function loadUser() {
     }
 }
 
-function saveChats() {
-    if (!currentUser) return;
-    const storageKey = `ai_chats_${currentUser.username}`;
-    localStorage.setItem(storageKey, JSON.stringify({
-        chatIdCounter,
-        currentChatId,
-        chats
-    }));
+async function loadChats() {
+    try {
+        const res = await fetch(`${API_BASE}/api/ai/conversations`, { headers: authHeaders() });
+        if (!res.ok) throw new Error(`API 요청 실패: ${res.status}`);
+        const data = await res.json();
+        chats = data.map(c => ({ id: c.id, title: c.title, messages: [], loaded: false }));
+    } catch (e) {
+        console.error('대화 기록 로드 실패:', e);
+    }
 }
 
-function loadChats() {
-    if (!currentUser) return;
-    const storageKey = `ai_chats_${currentUser.username}`;
-    const saved = localStorage.getItem(storageKey);
-
-    if (saved) {
-        try {
-            const data = JSON.parse(saved);
-            chatIdCounter = data.chatIdCounter || 1;
-            currentChatId = data.currentChatId || '1';
-            chats = data.chats || { '1': { title: '새 대화', messages: [] } };
-        } catch (e) {
-            console.error('대화 기록 로드 실패:', e);
-        }
+async function loadMessages(chatId) {
+    const chat = findChat(chatId);
+    if (!chat || chat.loaded) return;
+    try {
+        const res = await fetch(`${API_BASE}/api/ai/conversations/${chatId}/messages`, { headers: authHeaders() });
+        if (!res.ok) throw new Error(`API 요청 실패: ${res.status}`);
+        const data = await res.json();
+        chat.messages = data.map(m => ({ role: m.role === 'assistant' ? 'ai' : m.role, content: m.content }));
+        chat.loaded = true;
+    } catch (e) {
+        console.error('대화 내용 로드 실패:', e);
     }
 }
 
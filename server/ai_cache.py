@@ -0,0 +1,75 @@
+import hashlib
+import json
+import os
+import time
+from collections import OrderedDict
+import ai_engine
+
+# 동일 질문 응답 캐시 (기본 비활성), 완료된 응답만 저장하고 원래 청크 단위로 재생
+AI_CACHE_ENABLED = os.getenv("AI_CACHE_ENABLED", "false").lower() == "true"
+AI_CACHE_TTL = float(os.getenv("AI_CACHE_TTL", "86400"))
+AI_CACHE_SIZE = int(os.getenv("AI_CACHE_SIZE", "500"))
+
+_cache = OrderedDict()
+_stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "purges": 0}
+
+def _normalize(text: str) -> str:
+    return " ".join(text.split())
+
+def make_key(message: str, history: list[dict] | None) -> str:
+    """(시스템 프롬프트, 대화 이력, 메시지, 모델)을 정규화한 캐시 키"""
+    normalized = [
+        ai_engine.SYSTEM_PROMPT,
+        [[m["role"], _normalize(m["content"])] for m in (history or [])],
+        _normalize(message),
+        ai_engine.MODEL
+    ]
+    return hashlib.sha256(json.dumps(normalized, ensure_ascii=False).encode()).hexdigest()
+
+def lookup(key: str):
+    """캐시된 청크 목록 반환 (없거나 만료 시 None)"""
+    if not AI_CACHE_ENABLED:
+        return None
+    entry = _cache.get(key)
+    if entry is None or entry[0] <= time.monotonic():
+        if entry is not None:
+            del _cache[key]
+            _stats["evictions"] += 1
+        _stats["misses"] += 1
+        return None
+    _cache.move_to_end(key)
+    _stats["hits"] += 1
+    return entry[1]
+
+def store(key: str, contents: list[str]):
+    if not AI_CACHE_ENABLED or not contents:
+        return
+    _cache[key] = (time.monotonic() + AI_CACHE_TTL, tuple(contents))
+    _cache.move_to_end(key)
+    _stats["stores"] += 1
+    while len(_cache) > AI_CACHE_SIZE:
+        _cache.popitem(last=False)
+        _stats["evictions"] += 1
+
+async def replay(contents):
+    """chat_stream과 같은 {"content", "done"} 형식으로 캐시된 응답 재생"""
+    for content in contents:
+        yield {"content": content, "done": False}
+    yield {"content": "", "done": True}
+
+def purge() -> int:
+    count = len(_cache)
+    _cache.clear()
+    _stats["purges"] += 1
+    return count
+
+def stats() -> dict:
+    total = _stats["hits"] + _stats["misses"]
+    return {
+        "enabled": AI_CACHE_ENABLED,
+        "size": len(_cache),
+        "max_size": AI_CACHE_SIZE,
+        "ttl": AI_CACHE_TTL,
+        **_stats,
+        "hit_rate": round(_stats["hits"] / total, 4) if total else 0
+    }
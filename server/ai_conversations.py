@@ -0,0 +1,119 @@
+import os
+import threading
+from collections import OrderedDict
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+from models import AiConversation, AiMessage
+
+# 최근 사용한 대화의 이력을 메모리에 유지 (없으면 DB에서 한 번 읽어 채움)
+# 항목은 updated_at 기준으로 검증: 다른 프로세스가 대화를 바꿨으면 DB에서 다시 읽음
+AI_CONVERSATION_CACHE_SIZE = int(os.getenv("AI_CONVERSATION_CACHE_SIZE", "200"))
+DEFAULT_TITLE = "새 대화"
+TITLE_LENGTH = 30
+
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+def _title_from(message: str) -> str:
+    return message[:TITLE_LENGTH] + ("..." if len(message) > TITLE_LENGTH else "")
+
+def _cache_put(conversation_id: str, user_id: int, updated_at, history: list):
+    with _cache_lock:
+        _cache[conversation_id] = (user_id, updated_at, history)
+        _cache.move_to_end(conversation_id)
+        while len(_cache) > AI_CONVERSATION_CACHE_SIZE:
+            _cache.popitem(last=False)
+
+def list_conversations(db: Session, user_id: int) -> list:
+    return db.query(AiConversation).filter(
+        AiConversation.user_id == user_id
+    ).order_by(AiConversation.updated_at.desc()).all()
+
+def create_conversation(db: Session, user_id: int, title: str = None) -> AiConversation:
+    conversation = AiConversation(user_id=user_id, title=title or DEFAULT_TITLE)
+    db.add(conversation)
+    db.commit()
+    db.refresh(conversation)
+    _cache_put(conversation.id, user_id, conversation.updated_at, [])
+    return conversation
+
+def get_history(db: Session, conversation_id: str, user_id: int):
+    """대화 이력 [{role, content}] 반환 (본인 대화가 아니거나 없으면 None)"""
+    row = db.query(AiConversation.user_id, AiConversation.updated_at).filter(
+        AiConversation.id == conversation_id
+    ).first()
+    with _cache_lock:
+        if row is None:
+            _cache.pop(conversation_id, None)
+            return None
+        entry = _cache.get(conversation_id)
+        if entry is not None and entry[1] == row.updated_at:
+            _cache.move_to_end(conversation_id)
+        else:
+            entry = None
+    if row.user_id != user_id:
+        return None
+    if entry is not None:
+        return list(entry[2])
+
+    rows = db.query(AiMessage.role, AiMessage.content).filter(
+        AiMessage.conversation_id == conversation_id
+    ).order_by(AiMessage.id).all()
+    history = [{"role": r.role, "content": r.content} for r in rows]
+    _cache_put(conversation_id, row.user_id, row.updated_at, history)
+    return list(history)
+
+def append_turn(db: Session, conversation_id: str, user_id: int, message: str, answer: str):
+    """완료된 질문/응답 한 쌍 저장 (첫 질문이면 제목도 설정)"""
+    # 행 잠금으로 다른 프로세스의 동시 저장과 순서를 맞춤 (캐시 갱신 전 값 확인용)
+    previous = db.query(AiConversation.updated_at).filter(
+        AiConversation.id == conversation_id,
+        AiConversation.user_id == user_id
+    ).with_for_update().scalar()
+    db.add_all([
+        AiMessage(conversation_id=conversation_id, role="user", content=message),
+        AiMessage(conversation_id=conversation_id, role="assistant", content=answer)
+    ])
+    db.query(AiConversation).filter(
+        AiConversation.id == conversation_id,
+        AiConversation.user_id == user_id
+    ).update({
+        AiConversation.updated_at: func.now(),
+        AiConversation.title: case(
+            (AiConversation.title == DEFAULT_TITLE, _title_from(message)),
+            else_=AiConversation.title
+        )
+    }, synchronize_session=False)
+    updated_at = db.query(AiConversation.updated_at).filter(AiConversation.id == conversation_id).scalar()
+    db.commit()
+
+    turn = [{"role": "user", "content": message}, {"role": "assistant", "content": answer}]
+    with _cache_lock:
+        entry = _cache.get(conversation_id)
+        if entry is not None:
+            if entry[1] == previous:
+                _cache[conversation_id] = (entry[0], updated_at, entry[2] + turn)
+            else:
+                _cache.pop(conversation_id, None)
+
+def get_messages(db: Session, conversation_id: str, user_id: int):
+    conversation = db.query(AiConversation).filter(
+        AiConversation.id == conversation_id,
+        AiConversation.user_id == user_id
+    ).first()
+    if conversation is None:
+        return None
+    return [
+        {"id": m.id, "role": m.role, "content": m.content, "created_at": m.created_at}
+        for m in conversation.messages
+    ]
+
+def delete_conversation(db: Session, conversation_id: str, user_id: int) -> bool:
+    deleted = db.query(AiConversation).filter(
+        AiConversation.id == conversation_id,
+        AiConversation.user_id == user_id
+    ).delete(synchronize_session=False)
+    db.commit()
+    with _cache_lock:
+        _cache.pop(conversation_id, None)
+    return bool(deleted)
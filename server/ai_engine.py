@@ -1,7 +1,28 @@
+import asyncio
 import json
+import os
+import time
 import httpx
+from logger import logger
+from metrics import Counter, HistogramMetric
 
-OLLAMA_BASE_URL = "http://host.docker.internal:11434"
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://host.docker.internal:11434")
+# 여러 GPU 서버 사용 시: "http://gpu1:11434|2,http://gpu2:11434|1" (주소|동시 생성 수)
+OLLAMA_BACKENDS = os.getenv("OLLAMA_BACKENDS", "")
+OLLAMA_CONCURRENCY = int(os.getenv("OLLAMA_CONCURRENCY", "1"))
+OLLAMA_HEALTH_INTERVAL = float(os.getenv("OLLAMA_HEALTH_INTERVAL", "15"))
+# read 타임아웃은 청크 사이 최대 대기 (모델 로딩 시간 포함), 멈춘 생성이 슬롯을 계속 잡지 않도록 함
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "180"))
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "32"))
+OLLAMA_KEEPALIVE_EXPIRY = float(os.getenv("OLLAMA_KEEPALIVE_EXPIRY", "30"))
+STATUS_CACHE_TTL = float(os.getenv("OLLAMA_STATUS_CACHE_TTL", "5"))
+STATUS_TIMEOUT = 5
+# 대화 이력 토큰 예산: 초과 시 오래된 턴을 통째로 잘라 예산의 LOW_WATER 비율 근처까지 줄임
+# 잘린 뒤의 앞부분(prefix)이 여러 턴 동안 동일하게 유지되도록 함 (Ollama KV 캐시 재사용)
+AI_HISTORY_TOKEN_BUDGET = int(os.getenv("AI_HISTORY_TOKEN_BUDGET", "3000"))
+AI_HISTORY_LOW_WATER = float(os.getenv("AI_HISTORY_LOW_WATER", "0.7"))
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
 MODEL = "deepseek-r1:14b"
 
 SYSTEM_PROMPT = (
@@ -11,17 +32,185 @@ SYSTEM_PROMPT = (
 )
 
 
+class OllamaBackend:
+    """Ollama 서버 1대와 동시 생성 한도"""
+
+    def __init__(self, url: str, limit: int):
+        self.url = url.rstrip("/")
+        self.limit = max(limit, 1)
+        self.outstanding = 0
+        # reachable: /api/tags 응답 여부, healthy: 라우팅 대상 (응답 + 모델 보유)
+        self.reachable = True
+        self.healthy = True
+        self.model_loaded = False
+        self.requests = 0
+        self.failures = 0
+
+    def to_dict(self) -> dict:
+        return {
+            "url": self.url,
+            "limit": self.limit,
+            "outstanding": self.outstanding,
+            "reachable": self.reachable,
+            "healthy": self.healthy,
+            "model_loaded": self.model_loaded,
+            "requests": self.requests,
+            "failures": self.failures
+        }
+
+
+def parse_backends(spec: str) -> list[OllamaBackend]:
+    backends = []
+    for item in spec.split(","):
+        item = item.strip()
+        if not item:
+            continue
+        url, _, limit = item.partition("|")
+        backends.append(OllamaBackend(url, int(limit) if limit else OLLAMA_CONCURRENCY))
+    return backends
+
+
+backends = parse_backends(OLLAMA_BACKENDS) or [OllamaBackend(OLLAMA_BASE_URL, OLLAMA_CONCURRENCY)]
+_client = None
+_health_task = None
+_on_capacity_change = None
+_status_cache = None
+_status_expires = 0.0
+_status_task = None
+_metrics = {
+    "requests": 0, "trimmed": 0, "dropped_messages": 0,
+    "prompt_tokens_sum": 0, "prompt_tokens_max": 0,
+    "ttft_ms_sum": 0.0, "ttft_ms_max": 0.0, "ttft_count": 0
+}
+_requests_total = Counter("dongin_ai_requests_total", "Ollama 생성 요청 수")
+_prompt_tokens_total = Counter("dongin_ai_prompt_tokens_total", "Ollama에 보낸 프롬프트 토큰 수")
+_ttft_seconds = HistogramMetric(
+    "dongin_ai_ttft_seconds", "AI 첫 토큰까지 걸린 시간",
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 20, 30, 60, 120)
+)
+
+
+def set_backends(spec: str):
+    """백엔드 구성 교체 (테스트/운영 중 변경용)"""
+    global backends
+    backends = parse_backends(spec)
+    _notify_capacity()
+
+
+def capacity() -> int:
+    """정상 백엔드의 동시 생성 한도 합 (모두 비정상이면 전체 합으로 요청을 흘려 오류를 바로 반환)"""
+    healthy = [b for b in backends if b.healthy]
+    return sum(b.limit for b in (healthy or backends))
+
+
+def _notify_capacity():
+    if _on_capacity_change:
+        _on_capacity_change(capacity())
+
+
+def _acquire() -> OllamaBackend:
+    # least-outstanding: 한도 대비 진행 중 요청 비율이 가장 낮은 정상 백엔드
+    candidates = [b for b in backends if b.healthy] or backends
+    backend = min(candidates, key=lambda b: (b.outstanding / b.limit, b.outstanding))
+    backend.outstanding += 1
+    backend.requests += 1
+    return backend
+
+
+def _mark_unhealthy(backend: OllamaBackend, error: Exception):
+    backend.failures += 1
+    backend.reachable = False
+    if backend.healthy:
+        backend.healthy = False
+        logger.warning(f"[AI 백엔드] 비정상 전환 | {backend.url} | {error}")
+        _notify_capacity()
+
+
+def estimate_tokens(text: str) -> int:
+    # 토크나이저 없이 근사 (한글 1자 ≈ 1토큰, 영문 약 3~4자 ≈ 1토큰)
+    return len(text.encode("utf-8")) // 3 + 1
+
+
+def _trim_points(history: list[dict], sizes: list[int]) -> list[int]:
+    """잘라낼 수 있는 위치: 앞 구간이 예산의 (1 - LOW_WATER) 이상 쌓인 뒤의 user 턴 시작"""
+    # 대화 앞부분만으로 정해지므로 이후 턴이 추가되어도 위치가 바뀌지 않음
+    chunk = AI_HISTORY_TOKEN_BUDGET * (1 - AI_HISTORY_LOW_WATER)
+    points = []
+    acc = 0
+    for i, m in enumerate(history):
+        if m["role"] == "user" and (not points or acc >= chunk):
+            points.append(i)
+            acc = 0
+        acc += sizes[i]
+    return points
+
+
+def compact_history(history: list[dict] | None, message: str) -> tuple[list[dict], int]:
+    """토큰 예산을 넘으면 고정된 위치에서 오래된 턴을 통째로 제거 (최근 user 턴부터는 유지), (이력, 제거 수) 반환"""
+    history = history or []
+    budget = AI_HISTORY_TOKEN_BUDGET - estimate_tokens(SYSTEM_PROMPT) - estimate_tokens(message)
+    sizes = [estimate_tokens(m["content"]) for m in history]
+    if sum(sizes) <= budget:
+        return history, 0
+
+    # 예산 안에 들어오는 가장 앞의 위치, 없으면 마지막 user 턴
+    points = _trim_points(history, sizes)
+    if not points:
+        return [], len(history)
+    dropped = points[-1]
+    for point in points:
+        if sum(sizes[point:]) <= budget:
+            dropped = point
+            break
+    return history[dropped:], dropped
+
+
+def _record_metrics(prompt_tokens: int, ttft_ms: float | None, dropped: int):
+    m = _metrics
+    m["requests"] += 1
+    if dropped:
+        m["trimmed"] += 1
+        m["dropped_messages"] += dropped
+    m["prompt_tokens_sum"] += prompt_tokens
+    m["prompt_tokens_max"] = max(m["prompt_tokens_max"], prompt_tokens)
+    _requests_total.inc()
+    _prompt_tokens_total.inc(prompt_tokens)
+    if ttft_ms is not None:
+        _ttft_seconds.observe(ttft_ms / 1000)
+        m["ttft_count"] += 1
+        m["ttft_ms_sum"] += ttft_ms
+        m["ttft_ms_max"] = max(m["ttft_ms_max"], ttft_ms)
+
+
+def metrics() -> dict:
+    m = _metrics
+    return {
+        "requests": m["requests"],
+        "trimmed": m["trimmed"],
+        "dropped_messages": m["dropped_messages"],
+        "token_budget": AI_HISTORY_TOKEN_BUDGET,
+        "prompt_tokens_avg": round(m["prompt_tokens_sum"] / m["requests"], 1) if m["requests"] else 0,
+        "prompt_tokens_max": m["prompt_tokens_max"],
+        "ttft_ms_avg": round(m["ttft_ms_sum"] / m["ttft_count"], 3) if m["ttft_count"] else 0,
+        "ttft_ms_max": round(m["ttft_ms_max"], 3)
+    }
+
+
 async def chat_stream(message: str, history: list[dict] | None = None):
+    history, dropped = compact_history(history, message)
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    if history:
-        messages.extend(history)
+    messages.extend(history)
     messages.append({"role": "user", "content": message})
+    prompt_tokens = sum(estimate_tokens(m["content"]) for m in messages)
 
-    async with httpx.AsyncClient(base_url=OLLAMA_BASE_URL, timeout=None) as client:
-        async with client.stream(
+    backend = _acquire()
+    started = time.perf_counter()
+    ttft_ms = None
+    try:
+        async with _client.stream(
             "POST",
-            "/api/chat",
-            json={"model": MODEL, "messages": messages, "stream": True},
+            f"{backend.url}/api/chat",
+            json={"model": MODEL, "messages": messages, "stream": True, "keep_alive": OLLAMA_KEEP_ALIVE},
         ) as resp:
             resp.raise_for_status()
             async for line in resp.aiter_lines():
@@ -31,19 +220,102 @@ async def chat_stream(message: str, history: list[dict] | None = None):
                 content = chunk.get("message", {}).get("content", "")
                 done = chunk.get("done", False)
                 if content:
+                    if ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
                     yield {"content": content, "done": False}
                 if done:
+                    # Ollama가 보고한 실제 프롬프트 토큰 수 우선 (KV 캐시 재사용 시 줄어듦)
+                    prompt_tokens = chunk.get("prompt_eval_count", prompt_tokens)
                     yield {"content": "", "done": True}
                     return
+    except (httpx.ConnectError, httpx.ConnectTimeout) as e:
+        _mark_unhealthy(backend, e)
+        raise
+    except httpx.ReadTimeout:
+        logger.warning(f"[AI 백엔드] 응답 시간 초과 | {backend.url} | {OLLAMA_READ_TIMEOUT}초")
+        raise
+    finally:
+        backend.outstanding -= 1
+        _record_metrics(prompt_tokens, ttft_ms, dropped)
+        ttft_text = f"{ttft_ms:.0f}ms" if ttft_ms is not None else "-"
+        logger.info(f"[AI 생성] {backend.url} | 프롬프트 토큰: {prompt_tokens} | 첫 토큰: {ttft_text} | 생략된 이력: {dropped}개")
 
 
-async def check_status() -> dict:
+async def _check_backend(backend: OllamaBackend) -> OllamaBackend:
     try:
-        async with httpx.AsyncClient(base_url=OLLAMA_BASE_URL, timeout=5) as client:
-            resp = await client.get("/api/tags")
-            resp.raise_for_status()
-            models = [m["name"] for m in resp.json().get("models", [])]
-            model_loaded = any(MODEL in m for m in models)
-            return {"ollama": True, "model_loaded": model_loaded, "model": MODEL}
+        resp = await _client.get(f"{backend.url}/api/tags", timeout=STATUS_TIMEOUT)
+        resp.raise_for_status()
+        models = [m["name"] for m in resp.json().get("models", [])]
+        backend.reachable = True
+        backend.model_loaded = any(MODEL in m for m in models)
     except Exception:
-        return {"ollama": False, "model_loaded": False, "model": MODEL}
+        backend.reachable = False
+        backend.model_loaded = False
+    healthy = backend.reachable and backend.model_loaded
+
+    if healthy != backend.healthy:
+        backend.healthy = healthy
+        logger.info(f"[AI 백엔드] {'정상' if healthy else '비정상'} 전환 | {backend.url}")
+    return backend
+
+
+async def _refresh_status() -> dict:
+    global _status_cache, _status_expires
+    before = capacity()
+    checked = await asyncio.gather(*(_check_backend(b) for b in backends))
+    if capacity() != before:
+        _notify_capacity()
+    _status_cache = {
+        "ollama": any(b.reachable for b in checked),
+        "model_loaded": any(b.model_loaded for b in checked),
+        "model": MODEL,
+        "capacity": capacity(),
+        "backends": [b.to_dict() for b in checked]
+    }
+    _status_expires = time.monotonic() + STATUS_CACHE_TTL
+    return _status_cache
+
+
+async def check_status(force: bool = False) -> dict:
+    """전체 백엔드 상태 확인 (STATUS_CACHE_TTL 동안 캐시, 동시 호출은 한 번만 조회)"""
+    global _status_task
+    if not force and _status_cache is not None and time.monotonic() < _status_expires:
+        return _status_cache
+    if _status_task is None or _status_task.done():
+        _status_task = asyncio.create_task(_refresh_status())
+    return await asyncio.shield(_status_task)
+
+
+async def _health_loop():
+    while True:
+        try:
+            await check_status(force=True)
+        except Exception as e:
+            logger.error(f"[AI 백엔드] 상태 확인 실패 | {e}")
+        await asyncio.sleep(OLLAMA_HEALTH_INTERVAL)
+
+
+async def start(on_capacity_change=None):
+    """공용 HTTP 클라이언트 생성 및 주기적 상태 확인 시작, 전체 한도가 바뀌면 on_capacity_change(capacity) 호출"""
+    global _client, _health_task, _on_capacity_change
+    _client = httpx.AsyncClient(
+        timeout=httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+        limits=httpx.Limits(
+            max_connections=OLLAMA_MAX_CONNECTIONS,
+            max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+            keepalive_expiry=OLLAMA_KEEPALIVE_EXPIRY
+        )
+    )
+    _on_capacity_change = on_capacity_change
+    _notify_capacity()
+    _health_task = asyncio.create_task(_health_loop())
+    logger.info(f"[AI 백엔드] {len(backends)}대 | 전체 동시 생성 한도: {capacity()}")
+
+
+async def stop():
+    global _client
+    if _health_task:
+        _health_task.cancel()
+    if _client:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,137 @@
+import asyncio
+import itertools
+import os
+import time
+from logger import logger
+from metrics import Gauge, HistogramMetric
+
+# 대기열 정렬 방식 (fifo | fair), 슬롯 수는 ai_engine 백엔드 한도 합으로 설정됨
+AI_SCHEDULER_POLICY = os.getenv("AI_SCHEDULER_POLICY", "fifo").lower()
+
+_wait_seconds = HistogramMetric(
+    "dongin_ai_queue_wait_seconds", "AI 요청 대기열 대기 시간",
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600)
+)
+
+class AiJob:
+    """스케줄러에 등록된 AI 요청 1건"""
+
+    def __init__(self, seq: int, user_id: int):
+        self.seq = seq
+        self.user_id = user_id
+        self.position = None
+        self.running = False
+        self.enqueued_at = time.perf_counter()
+        self.started_at = None
+        self._changed = asyncio.Event()
+
+class AiScheduler:
+    """슬롯 기반 AI 작업 스케줄러 (순번 변경 시에만 대기자에게 알림)"""
+
+    def __init__(self, slots: int = 1, policy: str = AI_SCHEDULER_POLICY):
+        if policy not in ("fifo", "fair"):
+            logger.warning(f"[AI 스케줄러] 알 수 없는 정책: {policy} | fifo 사용")
+            policy = "fifo"
+        self.slots = max(slots, 1)
+        self.policy = policy
+        self._seq = itertools.count()
+        self._waiting = []
+        self._running = set()
+        self._stats = {"submitted": 0, "completed": 0, "cancelled": 0, "wait_ms_sum": 0.0, "wait_ms_max": 0.0}
+
+    def set_slots(self, slots: int):
+        """전체 슬롯 수 변경 (백엔드 구성 변경 시)"""
+        self.slots = max(slots, 1)
+        self._dispatch()
+
+    def submit(self, user_id: int) -> AiJob:
+        job = AiJob(next(self._seq), user_id)
+        self._waiting.append(job)
+        self._stats["submitted"] += 1
+        self._dispatch()
+        return job
+
+    async def wait(self, job: AiJob):
+        """슬롯을 받을 때까지 순번이 바뀔 때마다 순번을 yield"""
+        last = None
+        while True:
+            job._changed.clear()
+            if job.running:
+                return
+            if job.position != last:
+                last = job.position
+                yield last
+            await job._changed.wait()
+
+    def release(self, job: AiJob):
+        """완료/취소된 작업의 슬롯 반납 (중복 호출 허용)"""
+        if job.running:
+            self._running.discard(job)
+            job.running = False
+            self._stats["completed"] += 1
+        elif job in self._waiting:
+            self._waiting.remove(job)
+            self._stats["cancelled"] += 1
+            logger.info(f"[AI 스케줄러] 대기 취소 | 사용자: {job.user_id} | 순번: {job.position}")
+        else:
+            return
+        self._dispatch()
+
+    def _order(self) -> list:
+        if self.policy == "fifo":
+            return list(self._waiting)
+
+        # fair: 사용자별 (실행 중 + 앞선 대기) 건수가 적은 요청 우선, 같으면 먼저 온 순서
+        per_user = {}
+        for job in self._running:
+            per_user[job.user_id] = per_user.get(job.user_id, 0) + 1
+        keyed = []
+        for job in self._waiting:
+            rank = per_user.get(job.user_id, 0)
+            per_user[job.user_id] = rank + 1
+            keyed.append((rank, job.seq, job))
+        keyed.sort(key=lambda k: (k[0], k[1]))
+        return [k[2] for k in keyed]
+
+    def _dispatch(self):
+        order = self._order()
+        while order and len(self._running) < self.slots:
+            job = order.pop(0)
+            self._waiting.remove(job)
+            self._running.add(job)
+            job.running = True
+            job.position = None
+            job.started_at = time.perf_counter()
+            wait_ms = (job.started_at - job.enqueued_at) * 1000
+            _wait_seconds.observe(wait_ms / 1000)
+            self._stats["wait_ms_sum"] += wait_ms
+            self._stats["wait_ms_max"] = max(self._stats["wait_ms_max"], wait_ms)
+            job._changed.set()
+            if self.policy == "fair":
+                order = self._order()
+
+        for index, job in enumerate(order):
+            if job.position != index + 1:
+                job.position = index + 1
+                job._changed.set()
+
+    def stats(self) -> dict:
+        s = self._stats
+        started = s["submitted"] - s["cancelled"] - len(self._waiting)
+        return {
+            "policy": self.policy,
+            "slots": self.slots,
+            "running": len(self._running),
+            "waiting": len(self._waiting),
+            "submitted": s["submitted"],
+            "completed": s["completed"],
+            "cancelled": s["cancelled"],
+            "wait_ms_avg": round(s["wait_ms_sum"] / started, 3) if started else 0,
+            "wait_ms_max": round(s["wait_ms_max"], 3)
+        }
+
+scheduler = AiScheduler()
+
+Gauge("dongin_ai_queue_depth", "AI 대기열 길이", lambda: len(scheduler._waiting))
+Gauge("dongin_ai_running", "생성 중인 AI 요청 수", lambda: len(scheduler._running))
+Gauge("dongin_ai_slots", "AI 동시 처리 슬롯 수", lambda: scheduler.slots)
@@ -0,0 +1,149 @@
+import asyncio
+import os
+
+# chat_stream 후처리: 추론(<think>) 구간 제거 후 작은 토큰 청크를 시간/크기 단위로 묶어 SSE 프레임 수를 줄임
+AI_STRIP_REASONING = os.getenv("AI_STRIP_REASONING", "true").lower() == "true"
+AI_COALESCE_MS = float(os.getenv("AI_COALESCE_MS", "30"))
+AI_COALESCE_MAX_CHARS = int(os.getenv("AI_COALESCE_MAX_CHARS", "512"))
+
+THINK_OPEN = "<think>"
+THINK_CLOSE = "</think>"
+
+_stats = {"chunks_in": 0, "frames_out": 0, "reasoning_chars": 0, "unterminated_reasoning": 0}
+
+def _partial_tag(text: str, tag: str) -> str:
+    """청크 끝에 걸친 태그 앞부분 (다음 청크와 이어 붙여 판단)"""
+    for i in range(min(len(tag) - 1, len(text)), 0, -1):
+        if text.endswith(tag[:i]):
+            return text[-i:]
+    return ""
+
+async def strip_reasoning(chunks):
+    """<think>...</think> 구간을 청크 경계와 무관하게 제거 (닫히지 않은 채 끝나고 답변이 없으면 추론 내용을 그대로 전달)"""
+    inside = False
+    carry = ""
+    started = False
+    reasoning = []
+    async for chunk in chunks:
+        text = carry + chunk["content"]
+        carry = ""
+        out = []
+        while text:
+            if inside:
+                end = text.find(THINK_CLOSE)
+                if end == -1:
+                    carry = _partial_tag(text, THINK_CLOSE)
+                    reasoning.append(text[:len(text) - len(carry)])
+                    _stats["reasoning_chars"] += len(text) - len(carry)
+                    text = ""
+                else:
+                    _stats["reasoning_chars"] += end
+                    reasoning.clear()
+                    inside = False
+                    text = text[end + len(THINK_CLOSE):]
+            else:
+                start = text.find(THINK_OPEN)
+                if start == -1:
+                    carry = _partial_tag(text, THINK_OPEN)
+                    out.append(text[:len(text) - len(carry)])
+                    text = ""
+                else:
+                    out.append(text[:start])
+                    inside = True
+                    text = text[start + len(THINK_OPEN):]
+
+        content = "".join(out)
+        if chunk["done"] and not inside:
+            content += carry
+        elif chunk["done"] and not started:
+            # 출력 한도 등으로 </think> 없이 끝나면 빈 답변 대신 추론 내용 전달
+            _stats["unterminated_reasoning"] += 1
+            content += "".join(reasoning) + carry
+        if not started:
+            # 추론 구간 뒤의 빈 줄로 답변이 시작되지 않도록
+            content = content.lstrip()
+            started = bool(content)
+        if content or chunk["done"]:
+            yield {"content": content, "done": chunk["done"]}
+
+async def coalesce(chunks, interval_ms: float = AI_COALESCE_MS, max_chars: int = AI_COALESCE_MAX_CHARS):
+    """첫 청크 후 interval_ms 경과 또는 max_chars 도달 시 묶어서 전달, done은 즉시 전달"""
+    # 원본 스트림(httpx 응답)은 하나의 태스크에서만 읽도록 별도 producer 태스크에서 소비
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    end = object()
+
+    async def produce():
+        try:
+            async for chunk in chunks:
+                await queue.put(chunk)
+            await queue.put(end)
+        except Exception as e:
+            await queue.put(e)
+
+    producer = asyncio.create_task(produce())
+    buffer = []
+    size = 0
+    deadline = None
+
+    def flush():
+        nonlocal buffer, size, deadline
+        content = "".join(buffer)
+        buffer, size, deadline = [], 0, None
+        _stats["frames_out"] += 1
+        return {"content": content, "done": False}
+
+    try:
+        while True:
+            timeout = None if deadline is None else max(deadline - loop.time(), 0)
+            try:
+                item = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                yield flush()
+                continue
+
+            if item is end:
+                break
+            if isinstance(item, Exception):
+                raise item
+
+            if item["content"]:
+                buffer.append(item["content"])
+                size += len(item["content"])
+                if deadline is None:
+                    deadline = loop.time() + interval_ms / 1000
+            if item["done"]:
+                if buffer:
+                    yield flush()
+                _stats["frames_out"] += 1
+                yield {"content": "", "done": True}
+                return
+            if size >= max_chars:
+                yield flush()
+
+        if buffer:
+            yield flush()
+    finally:
+        producer.cancel()
+        await asyncio.gather(producer, return_exceptions=True)
+
+async def _count(chunks):
+    async for chunk in chunks:
+        _stats["chunks_in"] += 1
+        yield chunk
+
+def pipeline(chunks):
+    """설정에 따라 추론 제거 → 청크 묶기 적용"""
+    chunks = _count(chunks)
+    if AI_STRIP_REASONING:
+        chunks = strip_reasoning(chunks)
+    if AI_COALESCE_MS > 0:
+        chunks = coalesce(chunks)
+    return chunks
+
+def stats() -> dict:
+    return {
+        "strip_reasoning": AI_STRIP_REASONING,
+        "coalesce_ms": AI_COALESCE_MS,
+        **_stats
+    }
@@ -1,19 +1,32 @@
+import asyncio
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
 import os
 import hashlib
+import threading
+import time
 from database import get_db
 from models import User
 from schemas import TokenData
+from metrics import Counter, HistogramMetric
 
 SECRET_KEY = os.getenv("SECRET_KEY", "change-this-secret-key-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 480
+# 사용자 캐시는 프로세스 로컬: invalidate_user는 같은 프로세스에만 적용되므로 main에서 워커 1개로 고정 (다른 프로세스는 TTL 만료까지 이전 값 사용)
+USER_CACHE_TTL = float(os.getenv("AUTH_USER_CACHE_TTL", "30"))
+USER_CACHE_SIZE = int(os.getenv("AUTH_USER_CACHE_SIZE", "1024"))
+# bcrypt 전용 스레드풀 (이벤트 루프/DB 스레드풀과 분리, 대기 한도 초과 시 503)
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "2"))
+PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", "32"))
 
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
@@ -21,16 +34,97 @@ oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 def _normalize_password(password: str) -> str:
     return hashlib.sha256(password.encode()).hexdigest()
 
-def verify_password(plain_password: str, hashed_password: str) -> bool:
+def get_password_hash(password: str) -> str:
+    return pwd_context.hash(_normalize_password(password))
+
+def _verify_and_update(plain_password: str, hashed_password: str):
     if pwd_context.verify(_normalize_password(plain_password), hashed_password):
-        return True
+        if pwd_context.needs_update(hashed_password):
+            return True, get_password_hash(plain_password)
+        return True, None
+    # SHA256 정규화 이전의 레거시 해시는 검증 성공 시 새 형식으로 재해싱
     try:
-        return pwd_context.verify(plain_password, hashed_password)
+        if pwd_context.verify(plain_password, hashed_password):
+            return True, get_password_hash(plain_password)
     except ValueError:
-        return False
+        pass
+    return False, None
 
-def get_password_hash(password: str) -> str:
-    return pwd_context.hash(_normalize_password(password))
+_hash_executor = ThreadPoolExecutor(max_workers=PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_hash_pending = 0
+_hash_stats = {
+    "calls": 0, "rejected": 0,
+    "queue_ms_sum": 0.0, "queue_ms_max": 0.0,
+    "hash_ms_sum": 0.0, "hash_ms_max": 0.0,
+    "rehashed": 0
+}
+
+_bcrypt_seconds = HistogramMetric(
+    "dongin_bcrypt_seconds", "bcrypt 해싱/검증 시간", ("op",),
+    buckets=(0.05, 0.1, 0.2, 0.3, 0.5, 0.75, 1, 2, 5)
+)
+_bcrypt_queue_seconds = HistogramMetric("dongin_bcrypt_queue_seconds", "bcrypt 스레드풀 대기 시간")
+_bcrypt_rejected = Counter("dongin_bcrypt_rejected_total", "대기 한도 초과로 거절된 bcrypt 요청 수")
+
+def _timed(func, queued_at, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    return result, started - queued_at, time.perf_counter() - started
+
+async def _run_hash(func, *args):
+    global _hash_pending
+    if _hash_pending >= PASSWORD_HASH_MAX_PENDING:
+        _hash_stats["rejected"] += 1
+        _bcrypt_rejected.inc()
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="요청이 많습니다. 잠시 후 다시 시도해주세요",
+            headers={"Retry-After": "1"},
+        )
+
+    _hash_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        result, queued, elapsed = await loop.run_in_executor(
+            _hash_executor, _timed, func, time.perf_counter(), *args
+        )
+    finally:
+        _hash_pending -= 1
+
+    _hash_stats["calls"] += 1
+    _hash_stats["queue_ms_sum"] += queued * 1000
+    _hash_stats["queue_ms_max"] = max(_hash_stats["queue_ms_max"], queued * 1000)
+    _hash_stats["hash_ms_sum"] += elapsed * 1000
+    _hash_stats["hash_ms_max"] = max(_hash_stats["hash_ms_max"], elapsed * 1000)
+    _bcrypt_queue_seconds.observe(queued)
+    _bcrypt_seconds.observe(elapsed, ("verify" if func is _verify_and_update else "hash",))
+    return result
+
+async def hash_password(password: str) -> str:
+    """bcrypt 해싱을 전용 스레드풀에서 실행"""
+    return await _run_hash(get_password_hash, password)
+
+async def verify_and_update(plain_password: str, hashed_password: str):
+    """비밀번호 검증 후 (성공 여부, 재해싱된 해시 또는 None) 반환"""
+    ok, new_hash = await _run_hash(_verify_and_update, plain_password, hashed_password)
+    if new_hash:
+        _hash_stats["rehashed"] += 1
+    return ok, new_hash
+
+def password_hash_stats() -> dict:
+    s = _hash_stats
+    return {
+        "workers": PASSWORD_HASH_WORKERS,
+        "max_pending": PASSWORD_HASH_MAX_PENDING,
+        "pending": _hash_pending,
+        "calls": s["calls"],
+        "rejected": s["rejected"],
+        "rehashed": s["rehashed"],
+        "queue_ms_avg": round(s["queue_ms_sum"] / s["calls"], 3) if s["calls"] else 0,
+        "queue_ms_max": round(s["queue_ms_max"], 3),
+        "hash_ms_avg": round(s["hash_ms_sum"] / s["calls"], 3) if s["calls"] else 0,
+        "hash_ms_max": round(s["hash_ms_max"], 3)
+    }
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     to_encode = data.copy()
@@ -38,7 +132,59 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> User:
+@dataclass(frozen=True)
+class CurrentUser:
+    """인증된 사용자 정보 (캐시되는 필드만 포함)"""
+    id: int
+    username: str
+    role: str
+    is_active: bool
+    name: str
+
+_user_cache = OrderedDict()
+_user_cache_lock = threading.Lock()
+_user_cache_stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+def load_current_user(username: str, db: Session) -> Optional[CurrentUser]:
+    """사용자 정보 조회 (TTL/LRU 캐시 우선)"""
+    now = time.monotonic()
+    with _user_cache_lock:
+        entry = _user_cache.get(username)
+        if entry and entry[0] > now:
+            _user_cache.move_to_end(username)
+            _user_cache_stats["hits"] += 1
+            return entry[1]
+        _user_cache_stats["misses"] += 1
+
+    row = db.query(User.id, User.username, User.role, User.is_active, User.name).filter(
+        User.username == username
+    ).first()
+    if row is None:
+        return None
+
+    user = CurrentUser(id=row.id, username=row.username, role=row.role, is_active=row.is_active, name=row.name)
+    with _user_cache_lock:
+        _user_cache[username] = (now + USER_CACHE_TTL, user)
+        _user_cache.move_to_end(username)
+        while len(_user_cache) > USER_CACHE_SIZE:
+            _user_cache.popitem(last=False)
+    return user
+
+def invalidate_user(username: str):
+    """관리자 작업 등으로 변경된 사용자의 캐시 제거"""
+    with _user_cache_lock:
+        if _user_cache.pop(username, None) is not None:
+            _user_cache_stats["invalidations"] += 1
+
+def user_cache_stats() -> dict:
+    with _user_cache_lock:
+        stats = dict(_user_cache_stats)
+        stats["size"] = len(_user_cache)
+    total = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / total, 4) if total else 0
+    return stats
+
+def get_current_user(request: Request, token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)) -> CurrentUser:
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="인증 실패",
@@ -52,12 +198,14 @@ def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(
     except JWTError:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    user = load_current_user(username, db)
     if user is None or not user.is_active:
         raise credentials_exception
+    # 접근 로그에 사용자 기록용
+    request.state.username = user.username
     return user
 
-def get_current_active_admin(current_user: User = Depends(get_current_user)) -> User:
+def get_current_active_admin(current_user: CurrentUser = Depends(get_current_user)) -> CurrentUser:
     if current_user.role != "admin":
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="관리자 권한 필요")
     return current_user
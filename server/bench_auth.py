@@ -0,0 +1,67 @@
+import statistics
+import sys
+import time
+from jose import jwt
+from sqlalchemy import event
+from database import SessionLocal, engine
+from models import User
+from auth import SECRET_KEY, ALGORITHM, create_access_token, load_current_user, invalidate_user
+
+# 요청당 인증 비용 비교: JWT 디코드 + User 전체 조회 (이전) vs load_current_user 캐시 미스 / 캐시 적중
+# 사용법: python bench_auth.py [반복 횟수]
+# DATABASE_URL이 가리키는 DB에 사용자가 한 명 이상 있어야 함
+
+REPEAT = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+
+_queries = 0
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    global _queries
+    _queries += 1
+
+def legacy(token: str, db):
+    """캐시 도입 전 get_current_user (매 요청 User 행 전체 조회)"""
+    username = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["sub"]
+    return db.query(User).filter(User.username == username).first()
+
+def cold(token: str, db):
+    username = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["sub"]
+    invalidate_user(username)
+    return load_current_user(username, db)
+
+def warm(token: str, db):
+    username = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])["sub"]
+    return load_current_user(username, db)
+
+def measure(func, token: str, db):
+    global _queries
+    samples = []
+    _queries = 0
+    for _ in range(REPEAT):
+        db.expire_all()
+        started = time.perf_counter()
+        func(token, db)
+        samples.append((time.perf_counter() - started) * 1_000_000)
+    samples.sort()
+    return _queries / REPEAT, statistics.median(samples), samples[int(len(samples) * 0.99) - 1]
+
+def main():
+    db = SessionLocal()
+    user = db.query(User).order_by(User.id).first()
+    if user is None:
+        raise SystemExit("사용자가 없습니다. 서버를 한 번 실행해 테스트 계정을 만든 뒤 다시 실행하세요")
+    token = create_access_token({"sub": user.username})
+
+    print("=" * 50)
+    print(f"인증 오버헤드 벤치마크 | 반복: {REPEAT}")
+    print("=" * 50)
+    try:
+        for label, func in (("이전", legacy), ("캐시 미스", cold), ("캐시 적중", warm)):
+            queries, p50, p99 = measure(func, token, db)
+            print(f"{label:<6} | 요청당 쿼리: {queries:.2f} | p50: {p50:8.1f}us | p99: {p99:8.1f}us")
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import json
+import sys
+import time
+import tracemalloc
+from chat_connection import encode_message, orjson
+
+# 브로드캐스트 직렬화 비용 비교: 수신자마다 json.dumps (이전 send_json) vs 이벤트당 1회 encode_message
+# 방 인원 1/10/100명에 대해 브로드캐스트 1회당 CPU 시간과 송신 큐에 쌓인 프레임의 최대 할당량 측정
+# 사용법: python bench_broadcast_encode.py [브로드캐스트 횟수] [메시지 길이]
+
+BROADCASTS = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+CONTENT_LENGTH = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+ROOM_SIZES = (1, 10, 100)
+
+MESSAGE = {
+    "type": "message",
+    "data": {
+        "id": 123456,
+        "room_id": "3f1c2a9e-8a7b-4c51-9d2e-6b0f4e7a1c33",
+        "user_id": 42,
+        "user_name": "홍길동",
+        "content": ("안녕하세요 회의 자료 공유드립니다 " * 20)[:CONTENT_LENGTH],
+        "type": "text",
+        "file_id": None,
+        "created_at": "2026-10-17T09:30:00+09:00",
+        "read_by": []
+    }
+}
+
+class Sink:
+    """연결별 송신 큐 흉내 (전송 전까지 프레임을 보관)"""
+
+    def __init__(self):
+        self.queue = []
+
+    def send_text(self, frame: str):
+        self.queue.append(frame)
+
+def flush(sinks: list):
+    for sink in sinks:
+        sink.queue.clear()
+
+def per_recipient(sinks: list):
+    # Starlette WebSocket.send_json과 같은 인코딩
+    for sink in sinks:
+        sink.send_text(json.dumps(MESSAGE, separators=(",", ":"), ensure_ascii=False))
+
+def once(sinks: list):
+    frame = encode_message(MESSAGE)
+    for sink in sinks:
+        sink.send_text(frame)
+
+def measure(func, room_size: int):
+    sinks = [Sink() for _ in range(room_size)]
+    started = time.process_time()
+    for _ in range(BROADCASTS):
+        func(sinks)
+        flush(sinks)
+    cpu_us = (time.process_time() - started) / BROADCASTS * 1_000_000
+
+    tracemalloc.start()
+    peaks = []
+    for _ in range(min(BROADCASTS, 200)):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        func(sinks)
+        peaks.append(tracemalloc.get_traced_memory()[1] - base)
+        flush(sinks)
+    tracemalloc.stop()
+    return cpu_us, max(peaks) / 1024
+
+def main():
+    print("=" * 50)
+    print(f"브로드캐스트 직렬화 벤치마크 | 횟수: {BROADCASTS} | 메시지 길이: {CONTENT_LENGTH}자 | orjson: {orjson is not None}")
+    print("=" * 50)
+    for room_size in ROOM_SIZES:
+        before_cpu, before_kb = measure(per_recipient, room_size)
+        after_cpu, after_kb = measure(once, room_size)
+        print(f"{room_size:>3}명 | 이전: {before_cpu:8.1f}us {before_kb:7.1f}KB | "
+              f"현재: {after_cpu:7.1f}us {after_kb:5.1f}KB | CPU {before_cpu / after_cpu:5.1f}배")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import statistics
+import sys
+import time
+from sqlalchemy import text
+from database import SessionLocal, Base, engine
+from models import ChatRoom, ChatRoomMember, ChatMessage, User
+import chat_history
+
+# 메시지 이력 페이지 지연 비교: 키셋(커서) vs OFFSET, 깊이별 측정
+# 사용법: python bench_chat_history.py [메시지 수] [반복 횟수] [--keep]
+# 메시지 수만큼 벤치마크용 채팅방에 데이터를 넣고, --keep이 없으면 끝난 뒤 삭제
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 and sys.argv[1].isdigit() else 1_000_000
+REPEAT = int(sys.argv[2]) if len(sys.argv) > 2 and sys.argv[2].isdigit() else 20
+KEEP = "--keep" in sys.argv
+PAGE = chat_history.CHAT_HISTORY_DEFAULT_LIMIT
+DEPTHS = [d for d in (0, 1_000, 10_000, 100_000, 500_000, MESSAGES - PAGE) if 0 <= d <= MESSAGES - PAGE]
+
+def seed(db) -> ChatRoom:
+    user = db.query(User).order_by(User.id).first()
+    if user is None:
+        raise SystemExit("사용자가 없습니다. 서버를 한 번 실행해 테스트 계정을 만든 뒤 다시 실행하세요")
+
+    room = ChatRoom(name="[벤치마크] 메시지 이력", type="group")
+    db.add(room)
+    db.flush()
+    db.add(ChatRoomMember(room_id=room.id, user_id=user.id))
+    db.commit()
+
+    started = time.perf_counter()
+    db.execute(text("""
+        INSERT INTO chat_messages (room_id, user_id, content, type, created_at)
+        SELECT :room_id, :user_id, '벤치마크 메시지 ' || g, 'text', now() - (:n - g) * interval '1 second'
+        FROM generate_series(1, :n) AS g
+    """), {"room_id": room.id, "user_id": user.id, "n": MESSAGES})
+    db.commit()
+    db.execute(text("ANALYZE chat_messages"))
+    db.commit()
+    print(f"데이터 생성: {MESSAGES:,}건 | {time.perf_counter() - started:.1f}초")
+    return room
+
+def timed(func, *args) -> float:
+    samples = []
+    for _ in range(REPEAT):
+        started = time.perf_counter()
+        func(*args)
+        samples.append((time.perf_counter() - started) * 1000)
+    return statistics.median(samples)
+
+def offset_page(db, room_id: str, depth: int):
+    return db.query(ChatMessage).filter(ChatMessage.room_id == room_id).order_by(
+        ChatMessage.id.desc()
+    ).offset(depth).limit(PAGE).all()
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_room_id ON chat_messages (room_id, id)"))
+
+    print("=" * 50)
+    print(f"메시지 이력 벤치마크 | 메시지: {MESSAGES:,} | 페이지: {PAGE} | 반복: {REPEAT}")
+    print("=" * 50)
+
+    db = SessionLocal()
+    room = seed(db)
+    try:
+        for depth in DEPTHS:
+            # 해당 깊이의 커서는 측정 전에 한 번만 구함
+            before_id = db.query(ChatMessage.id).filter(ChatMessage.room_id == room.id).order_by(
+                ChatMessage.id.desc()
+            ).offset(depth).limit(1).scalar() + 1
+            cursor = chat_history.encode_cursor(before_id)
+
+            keyset_ms = timed(lambda: chat_history.fetch_page(db, room.id, chat_history.decode_cursor(cursor), PAGE))
+            offset_ms = timed(offset_page, db, room.id, depth)
+            print(f"깊이 {depth:>9,} | 키셋: {keyset_ms:7.2f}ms | OFFSET: {offset_ms:8.2f}ms")
+    finally:
+        if not KEEP:
+            db.query(ChatRoom).filter(ChatRoom.id == room.id).delete(synchronize_session=False)
+            db.commit()
+            print("벤치마크 채팅방 삭제 완료")
+        db.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,119 @@
+import statistics
+import sys
+import time
+from sqlalchemy import event, text
+from database import SessionLocal, Base, engine
+from models import ChatRoom, ChatRoomMember, ChatMessage, User
+from chat_rooms import get_room_list, rebuild_summaries
+
+# 채팅방 목록 조회 비용 비교: 방마다 쿼리 4회 (이전 방식) vs 요약 테이블 기반 get_room_list
+# 방 수를 늘려가며 쿼리 수와 p95 지연을 측정
+# 사용법: python bench_chat_rooms.py [방 수 목록 예: 10,30,60,120] [방당 메시지 수] [반복 횟수]
+# 벤치마크용 사용자(bench_rooms)와 채팅방은 끝난 뒤 삭제
+
+ROOM_COUNTS = [int(x) for x in (sys.argv[1] if len(sys.argv) > 1 else "10,30,60,120").split(",")]
+MESSAGES_PER_ROOM = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+REPEAT = int(sys.argv[3]) if len(sys.argv) > 3 else 30
+
+_queries = 0
+
+@event.listens_for(engine, "before_cursor_execute")
+def _count_query(conn, cursor, statement, parameters, context, executemany):
+    global _queries
+    _queries += 1
+
+def legacy_room_list(db, user_id: int) -> list:
+    """요약 테이블 도입 전 get_chat_rooms (방마다 마지막 메시지, 멤버 행, 안 읽은 수, 멤버 목록 조회)"""
+    rooms = db.query(ChatRoom).join(ChatRoomMember).filter(
+        ChatRoomMember.user_id == user_id
+    ).order_by(ChatRoom.updated_at.desc()).all()
+
+    result = []
+    for room in rooms:
+        last_msg = db.query(ChatMessage).filter(
+            ChatMessage.room_id == room.id
+        ).order_by(ChatMessage.created_at.desc()).first()
+        member = db.query(ChatRoomMember).filter(
+            ChatRoomMember.room_id == room.id,
+            ChatRoomMember.user_id == user_id
+        ).first()
+        unread_count = db.query(ChatMessage).filter(
+            ChatMessage.room_id == room.id,
+            ChatMessage.id > (member.last_read_id or 0)
+        ).count()
+        members = db.query(User).join(ChatRoomMember).filter(
+            ChatRoomMember.room_id == room.id
+        ).all()
+        result.append({
+            "id": room.id,
+            "name": room.name,
+            "type": room.type,
+            "members": [{"id": m.id, "name": m.name} for m in members],
+            "last_message": last_msg.content[:50] if last_msg and last_msg.content else None,
+            "unread_count": unread_count,
+            "updated_at": room.updated_at
+        })
+    return result
+
+def add_rooms(db, user: User, other: User, count: int, start: int):
+    room_ids = []
+    for i in range(start, start + count):
+        room = ChatRoom(name=f"[벤치마크] 방 {i}", type="group")
+        db.add(room)
+        db.flush()
+        room_ids.append(room.id)
+        db.add_all([ChatRoomMember(room_id=room.id, user_id=user.id), ChatRoomMember(room_id=room.id, user_id=other.id)])
+        db.execute(text("""
+            INSERT INTO chat_messages (room_id, user_id, content, type)
+            SELECT :room_id, :user_id, '벤치마크 메시지 ' || g, 'text' FROM generate_series(1, :n) AS g
+        """), {"room_id": room.id, "user_id": other.id, "n": MESSAGES_PER_ROOM})
+    db.commit()
+    # 벤치마크 방의 요약만 생성 (다른 방의 요약/읽음 오프셋은 건드리지 않음)
+    rebuild_summaries(db, room_ids)
+
+def measure(func, db, user_id: int):
+    global _queries
+    samples = []
+    queries = 0
+    for _ in range(REPEAT):
+        db.expire_all()
+        _queries = 0
+        started = time.perf_counter()
+        func(db, user_id)
+        samples.append((time.perf_counter() - started) * 1000)
+        queries = _queries
+    samples.sort()
+    return queries, statistics.median(samples), samples[int(len(samples) * 0.95) - 1]
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    other = db.query(User).order_by(User.id).first()
+    if other is None:
+        raise SystemExit("사용자가 없습니다. 서버를 한 번 실행해 테스트 계정을 만든 뒤 다시 실행하세요")
+    user = User(username="bench_rooms", hashed_password="-", name="벤치마크", position="테스트", is_active=False)
+    db.add(user)
+    db.commit()
+
+    print("=" * 50)
+    print(f"채팅방 목록 벤치마크 | 방당 메시지: {MESSAGES_PER_ROOM} | 반복: {REPEAT}")
+    print("=" * 50)
+    try:
+        created = 0
+        for room_count in sorted(ROOM_COUNTS):
+            add_rooms(db, user, other, room_count - created, created)
+            created = room_count
+            legacy = measure(legacy_room_list, db, user.id)
+            current = measure(get_room_list, db, user.id)
+            print(f"방 {room_count:>4} | 이전: 쿼리 {legacy[0]:>4} p50 {legacy[1]:7.2f}ms p95 {legacy[2]:7.2f}ms"
+                  f" | 현재: 쿼리 {current[0]:>2} p50 {current[1]:6.2f}ms p95 {current[2]:6.2f}ms")
+    finally:
+        room_ids = [r.room_id for r in db.query(ChatRoomMember.room_id).filter(ChatRoomMember.user_id == user.id)]
+        db.query(ChatRoom).filter(ChatRoom.id.in_(room_ids)).delete(synchronize_session=False)
+        db.query(User).filter(User.id == user.id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        print("벤치마크 데이터 삭제 완료")
+
+if __name__ == "__main__":
+    main()
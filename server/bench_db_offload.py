@@ -0,0 +1,120 @@
+import asyncio
+import statistics
+import sys
+import time
+from sqlalchemy import text
+from database import SessionLocal, Base, engine, run_db, db_session, pool_status
+from models import ChatRoom, ChatRoomMember, ChatMessage, User
+from chat_manager import save_message
+
+# 채팅 메시지 저장 시 이벤트 루프 지연 비교: 루프에서 동기 Session 직접 사용 (이전) vs 메시지마다 db_session + run_db (현재)
+# 메시지 저장 코루틴과 느린 조회(pg_sleep)를 동시에 돌리면서 10ms 주기 프로브의 지연, 처리량, 커넥션 체크아웃 대기를 측정
+# 사용법: python bench_db_offload.py [메시지 수] [동시 전송 수] [느린 조회 수] [느린 조회 시간(ms)]
+# 벤치마크 채팅방은 끝난 뒤 삭제
+
+MESSAGES = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+SLOW_QUERIES = int(sys.argv[3]) if len(sys.argv) > 3 else 20
+SLOW_QUERY_MS = float(sys.argv[4]) if len(sys.argv) > 4 else 100
+PROBE_INTERVAL = 0.01
+
+def slow_query(db):
+    db.execute(text("SELECT pg_sleep(:s)"), {"s": SLOW_QUERY_MS / 1000})
+
+async def inline_message(room_id: str, user_id: int, seq: int):
+    db = SessionLocal()
+    try:
+        save_message(db, ChatMessage(room_id=room_id, user_id=user_id, content=f"bench:{seq}", type="text"))
+    finally:
+        db.close()
+
+async def offload_message(room_id: str, user_id: int, seq: int):
+    async with db_session() as db:
+        await run_db(save_message, db, ChatMessage(room_id=room_id, user_id=user_id, content=f"bench:{seq}", type="text"))
+
+async def inline_slow():
+    db = SessionLocal()
+    try:
+        slow_query(db)
+    finally:
+        db.close()
+
+async def offload_slow():
+    async with db_session() as db:
+        await run_db(slow_query, db)
+
+async def probe(lags: list, stop: asyncio.Event):
+    while not stop.is_set():
+        expected = time.perf_counter() + PROBE_INTERVAL
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(max(0.0, time.perf_counter() - expected) * 1000)
+
+async def run(mode: str, room_id: str, user_id: int) -> dict:
+    send, slow = (inline_message, inline_slow) if mode == "inline" else (offload_message, offload_slow)
+    counter = iter(range(MESSAGES))
+    slow_counter = iter(range(SLOW_QUERIES))
+
+    async def sender():
+        for seq in counter:
+            await send(room_id, user_id, seq)
+            await asyncio.sleep(0)
+
+    async def reader():
+        for _ in slow_counter:
+            await slow()
+            await asyncio.sleep(0)
+
+    before = pool_status()
+    lags, stop = [], asyncio.Event()
+    probe_task = asyncio.create_task(probe(lags, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(sender() for _ in range(CONCURRENCY)),
+                         *(reader() for _ in range(max(1, CONCURRENCY // 4))))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await probe_task
+    after = pool_status()
+
+    lags.sort()
+    checkouts = after["checkouts"] - before["checkouts"]
+    wait_sum = after["wait_ms_avg"] * after["checkouts"] - before["wait_ms_avg"] * before["checkouts"]
+    return {
+        "throughput": MESSAGES / elapsed,
+        "lag_p50": statistics.median(lags) if lags else 0,
+        "lag_p99": lags[int(len(lags) * 0.99) - 1] if lags else 0,
+        "lag_max": lags[-1] if lags else 0,
+        "checkouts": checkouts,
+        "wait_avg": wait_sum / checkouts if checkouts else 0
+    }
+
+def main():
+    Base.metadata.create_all(bind=engine)
+    db = SessionLocal()
+    user = db.query(User).order_by(User.id).first()
+    if user is None:
+        raise SystemExit("사용자가 없습니다. 서버를 한 번 실행해 테스트 계정을 만든 뒤 다시 실행하세요")
+    room = ChatRoom(name="[벤치마크] DB 오프로드", type="group")
+    db.add(room)
+    db.flush()
+    db.add(ChatRoomMember(room_id=room.id, user_id=user.id))
+    db.commit()
+    room_id, user_id = room.id, user.id
+
+    print("=" * 50)
+    print(f"DB 오프로드 벤치마크 | 메시지: {MESSAGES} | 동시 전송: {CONCURRENCY} | "
+          f"느린 조회: {SLOW_QUERIES}×{SLOW_QUERY_MS:.0f}ms | 풀: {pool_status()['size']}")
+    print("=" * 50)
+    try:
+        for mode in ("inline", "offload"):
+            r = asyncio.run(run(mode, room_id, user_id))
+            print(f"{mode:>7} | 처리량: {r['throughput']:7.1f} msg/s | 루프 지연 p50: {r['lag_p50']:6.2f}ms "
+                  f"p99: {r['lag_p99']:7.2f}ms 최대: {r['lag_max']:7.2f}ms | "
+                  f"체크아웃: {r['checkouts']} (평균 대기 {r['wait_avg']:.3f}ms)")
+    finally:
+        db.query(ChatRoom).filter(ChatRoom.id == room_id).delete(synchronize_session=False)
+        db.commit()
+        db.close()
+        print("벤치마크 채팅방 삭제 완료")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+import queue
+import statistics
+import sys
+import tempfile
+import time
+from logging.handlers import RotatingFileHandler, QueueListener
+from pathlib import Path
+from logger import SeoulFormatter, BoundedQueueHandler, DispatchHandler
+
+# 로깅 방식별 요청 지연 비교: 끔 / 동기 파일 핸들러 / 큐 + 리스너 스레드
+# 요청 1건당 access·user·system 로그를 남기는 핸들러를 이벤트 루프에서 동시에 실행
+# 사용법: python bench_logging.py [요청 수] [동시 요청 수] [요청당 로그 줄 수] [쓰기 지연(ms)]
+# 쓰기 지연을 주면 느린 디스크/NFS를 흉내 냄 (tmpfs 등 빠른 디스크에서는 차이가 작음)
+
+REQUESTS = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+CONCURRENCY = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+LINES = int(sys.argv[3]) if len(sys.argv) > 3 else 3
+WRITE_DELAY_MS = float(sys.argv[4]) if len(sys.argv) > 4 else 0
+QUEUE_SIZE = 10000
+
+class SlowFileHandler(RotatingFileHandler):
+    def emit(self, record):
+        if WRITE_DELAY_MS:
+            time.sleep(WRITE_DELAY_MS / 1000)
+        super().emit(record)
+
+def make_file_handler(directory: Path, name: str) -> RotatingFileHandler:
+    handler = SlowFileHandler(directory / f"{name}.log", maxBytes=10*1024*1024, backupCount=5, encoding="utf-8")
+    handler.setFormatter(SeoulFormatter("%(asctime)s | %(message)s"))
+    return handler
+
+def setup(mode: str, directory: Path):
+    """모드별 로거 구성, (로거, 리스너, 큐 핸들러) 반환"""
+    target = logging.getLogger(f"bench.{mode}")
+    target.handlers.clear()
+    target.propagate = False
+    target.setLevel(logging.INFO)
+    if mode == "off":
+        target.disabled = True
+        return target, None, None
+
+    handler = make_file_handler(directory, mode)
+    if mode == "sync":
+        target.addHandler(handler)
+        return target, None, None
+
+    log_queue = queue.Queue(maxsize=QUEUE_SIZE)
+    dispatch = DispatchHandler()
+    dispatch.routes[target.name] = (handler,)
+    queue_handler = BoundedQueueHandler(log_queue)
+    target.addHandler(queue_handler)
+    listener = QueueListener(log_queue, dispatch)
+    listener.start()
+    return target, listener, queue_handler
+
+async def request(target: logging.Logger, i: int, latencies: list):
+    started = time.perf_counter()
+    for line in range(LINES):
+        target.info(f"[요청] GET /api/posts/{i} | 사용자: user{i % 100} | 줄: {line}")
+    target.debug(f"[디버그] 요청 {i} 상세")
+    await asyncio.sleep(0)
+    latencies.append((time.perf_counter() - started) * 1000)
+
+async def run(mode: str, directory: Path) -> dict:
+    target, listener, queue_handler = setup(mode, directory)
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def limited(i: int):
+        async with semaphore:
+            await request(target, i, latencies)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(limited(i) for i in range(REQUESTS)))
+    elapsed = time.perf_counter() - started
+    if listener:
+        listener.stop()
+    for handler in target.handlers:
+        handler.close()
+
+    latencies.sort()
+    return {
+        "mode": mode,
+        "elapsed": elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+        "max": latencies[-1],
+        "dropped": (queue_handler.dropped_debug + queue_handler.dropped) if queue_handler else 0
+    }
+
+async def main():
+    print("=" * 50)
+    print(f"로깅 벤치마크 | 요청: {REQUESTS} | 동시: {CONCURRENCY} | 요청당 로그: {LINES}줄 | 쓰기 지연: {WRITE_DELAY_MS}ms")
+    print("=" * 50)
+    with tempfile.TemporaryDirectory() as tmp:
+        directory = Path(tmp)
+        for mode in ("off", "sync", "queue"):
+            r = await run(mode, directory)
+            print(
+                f"{r['mode']:>5} | 소요: {r['elapsed']:.2f}초 | p50: {r['p50']:.3f}ms | "
+                f"p99: {r['p99']:.3f}ms | 최대: {r['max']:.3f}ms | 버린 로그: {r['dropped']}"
+            )
+
+if __name__ == "__main__":
+    asyncio.run(main())
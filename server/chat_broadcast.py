@@ -0,0 +1,214 @@
+import asyncio
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import psycopg2
+from database import engine
+from logger import logger
+from chat_connection import DROPPABLE_TYPES
+
+CHAT_BROADCAST_BACKEND = os.getenv("CHAT_BROADCAST_BACKEND", "local").lower()
+NOTIFY_CHANNEL = os.getenv("CHAT_NOTIFY_CHANNEL", "dongin_chat")
+# PgBouncer(transaction pooling)에서는 LISTEN이 동작하지 않으므로 DB 직접 주소 지정
+LISTEN_DATABASE_URL = os.getenv("CHAT_LISTEN_DATABASE_URL")
+
+# NOTIFY payload 한도(8000 bytes)를 넘지 않도록 분할 (UTF-8 최대 4 bytes/문자)
+NOTIFY_CHUNK_CHARS = 1900
+RECONNECT_DELAY = 3
+# 분할 전송 중 일부가 유실된 항목은 이 시간이 지나면 버림
+PARTIAL_TTL = 30
+PARTIAL_MAX = 256
+# 같은 타이핑 상태는 이 간격 안에 한 번만 다른 워커로 전달
+TYPING_NOTIFY_INTERVAL = float(os.getenv("CHAT_TYPING_NOTIFY_INTERVAL", "1"))
+
+class LocalBroadcastBackend:
+    """단일 프로세스 브로드캐스트 (기본값)"""
+    name = "local"
+
+    def __init__(self):
+        self._deliver = None
+
+    async def start(self, deliver):
+        self._deliver = deliver
+
+    async def stop(self):
+        self._deliver = None
+
+    async def publish(self, event: dict):
+        await self._deliver(event)
+
+class PostgresBroadcastBackend:
+    """Postgres LISTEN/NOTIFY 기반 워커 간 브로드캐스트"""
+    name = "postgres"
+
+    def __init__(self, channel: str = NOTIFY_CHANNEL):
+        self.channel = channel
+        self.origin = uuid.uuid4().hex
+        self._deliver = None
+        self._loop = None
+        self._conn = None
+        self._seq = 0
+        self._partial = {}
+        self._relayed = {}
+        self._reconnect_task = None
+        self._stopped = False
+        # NOTIFY는 커넥션 풀과 별도인 전용 커넥션 1개로 순서대로 전송
+        self._notify_conn = None
+        self._notify_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="chat-notify")
+
+    async def start(self, deliver):
+        self._deliver = deliver
+        self._loop = asyncio.get_running_loop()
+        self._stopped = False
+        await self._loop.run_in_executor(None, self._connect)
+        self._loop.add_reader(self._conn.fileno(), self._on_readable)
+        logger.info(f"[브로드캐스트] Postgres LISTEN 시작 | 채널: {self.channel} | 워커: {self.origin[:8]}")
+
+    async def stop(self):
+        self._stopped = True
+        if self._reconnect_task:
+            self._reconnect_task.cancel()
+        self._close()
+        await self._loop.run_in_executor(self._notify_executor, self._close_notify)
+
+    def _open_connection(self):
+        if LISTEN_DATABASE_URL:
+            return psycopg2.connect(LISTEN_DATABASE_URL)
+        return psycopg2.connect(**engine.url.translate_connect_args(username="user", database="dbname"))
+
+    def _connect(self):
+        conn = self._open_connection()
+        conn.set_isolation_level(psycopg2.extensions.ISOLATION_LEVEL_AUTOCOMMIT)
+        with conn.cursor() as cur:
+            cur.execute(f'LISTEN "{self.channel}"')
+        self._conn = conn
+
+    def _close(self):
+        if self._conn is None:
+            return
+        try:
+            self._loop.remove_reader(self._conn.fileno())
+        except Exception:
+            pass
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+        self._conn = None
+
+    async def _reconnect(self):
+        while not self._stopped:
+            await asyncio.sleep(RECONNECT_DELAY)
+            try:
+                await self._loop.run_in_executor(None, self._connect)
+                self._loop.add_reader(self._conn.fileno(), self._on_readable)
+                logger.info(f"[브로드캐스트] Postgres LISTEN 재연결 완료 | 채널: {self.channel}")
+                return
+            except Exception as e:
+                logger.error(f"[브로드캐스트] Postgres LISTEN 재연결 실패 | {e}")
+
+    def _on_readable(self):
+        try:
+            self._conn.poll()
+        except Exception as e:
+            logger.error(f"[브로드캐스트] Postgres LISTEN 연결 끊김 | {e}")
+            self._close()
+            self._reconnect_task = self._loop.create_task(self._reconnect())
+            return
+
+        while self._conn.notifies:
+            notify = self._conn.notifies.pop(0)
+            event = self._receive(notify.payload)
+            if event is not None:
+                self._loop.create_task(self._deliver(event))
+
+    def _receive(self, payload: str):
+        origin, seq, idx, total, data = payload.split(":", 4)
+        if origin == self.origin:
+            return None
+
+        total = int(total)
+        if total == 1:
+            return json.loads(data)
+
+        now = time.monotonic()
+        self._expire_partial(now)
+        key = (origin, seq)
+        entry = self._partial.get(key)
+        if entry is None:
+            entry = self._partial[key] = (now, [None] * total)
+        parts = entry[1]
+        parts[int(idx)] = data
+        if any(p is None for p in parts):
+            return None
+        del self._partial[key]
+        return json.loads("".join(parts))
+
+    def _expire_partial(self, now: float):
+        """발행 워커가 전송 중 종료되는 등 조각이 유실된 항목 정리"""
+        for key, (created, _) in list(self._partial.items()):
+            if now - created > PARTIAL_TTL or len(self._partial) > PARTIAL_MAX:
+                del self._partial[key]
+            else:
+                break
+
+    def _should_relay(self, event: dict) -> bool:
+        """타이핑처럼 버려도 되는 이벤트는 같은 내용을 짧은 간격 안에 반복 전송하지 않음"""
+        if event.get("type") not in DROPPABLE_TYPES:
+            return True
+        now = time.monotonic()
+        key = (event.get("room_id"), event.get("exclude_user_id"), event["frame"])
+        last = self._relayed.get(key)
+        if last is not None and now - last < TYPING_NOTIFY_INTERVAL:
+            return False
+        self._relayed[key] = now
+        if len(self._relayed) > PARTIAL_MAX:
+            self._relayed = {k: t for k, t in self._relayed.items() if now - t < TYPING_NOTIFY_INTERVAL}
+        return True
+
+    def _close_notify(self):
+        if self._notify_conn is not None:
+            try:
+                self._notify_conn.close()
+            except Exception:
+                pass
+            self._notify_conn = None
+
+    def _notify(self, payloads: list):
+        # 같은 트랜잭션의 NOTIFY는 커밋 시 순서대로 함께 전달됨
+        if self._notify_conn is None or self._notify_conn.closed:
+            self._notify_conn = self._open_connection()
+        try:
+            with self._notify_conn.cursor() as cur:
+                for payload in payloads:
+                    cur.execute("SELECT pg_notify(%s, %s)", (self.channel, payload))
+            self._notify_conn.commit()
+        except Exception:
+            self._close_notify()
+            raise
+
+    async def publish(self, event: dict):
+        # 현재 워커의 소켓에는 바로 전달하고, 다른 워커에는 NOTIFY로 전달
+        await self._deliver(event)
+        if not self._should_relay(event):
+            return
+
+        data = json.dumps(event, ensure_ascii=False, separators=(",", ":"))
+        chunks = [data[i:i + NOTIFY_CHUNK_CHARS] for i in range(0, len(data), NOTIFY_CHUNK_CHARS)]
+        self._seq += 1
+        payloads = [f"{self.origin}:{self._seq}:{i}:{len(chunks)}:{chunk}" for i, chunk in enumerate(chunks)]
+
+        try:
+            await self._loop.run_in_executor(self._notify_executor, self._notify, payloads)
+        except Exception as e:
+            logger.error(f"[브로드캐스트] NOTIFY 실패 | {e}")
+
+def create_backend():
+    """CHAT_BROADCAST_BACKEND 환경변수에 따라 백엔드 생성"""
+    if CHAT_BROADCAST_BACKEND == "postgres":
+        return PostgresBroadcastBackend()
+    if CHAT_BROADCAST_BACKEND != "local":
+        logger.warning(f"[브로드캐스트] 알 수 없는 백엔드: {CHAT_BROADCAST_BACKEND} | local 사용")
+    return LocalBroadcastBackend()
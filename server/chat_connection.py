@@ -0,0 +1,146 @@
+import asyncio
+import json
+import os
+import time
+from collections import deque
+from logger import logger
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# 느린 수신자 정책: 큐가 가득 차면 DROPPABLE 이벤트부터 버리고, 그래도 가득 차면 연결 종료
+SEND_QUEUE_SIZE = int(os.getenv("CHAT_SEND_QUEUE_SIZE", "256"))
+SEND_TIMEOUT = float(os.getenv("CHAT_SEND_TIMEOUT", "10"))
+DROPPABLE_TYPES = set(os.getenv("CHAT_DROPPABLE_TYPES", "typing").split(","))
+CLOSE_TIMEOUT = 3
+SLOW_CONSUMER_CLOSE_CODE = 1013
+
+room_stats = {}
+
+def encode_message(message: dict) -> str:
+    """이벤트를 텍스트 프레임으로 직렬화 (orjson 설치 시 사용)"""
+    if orjson is not None:
+        return orjson.dumps(message).decode()
+    return json.dumps(message, ensure_ascii=False, separators=(",", ":"))
+
+def record_fanout(room_id: str, recipients: int, elapsed_ms: float):
+    """방 브로드캐스트 1회의 큐 적재 시간 기록"""
+    stats = room_stats.setdefault(room_id, {
+        "broadcasts": 0, "recipients": 0, "fanout_ms_sum": 0.0, "fanout_ms_max": 0.0,
+        "deliveries": 0, "delivery_ms_sum": 0.0, "delivery_ms_max": 0.0
+    })
+    stats["broadcasts"] += 1
+    stats["recipients"] += recipients
+    stats["fanout_ms_sum"] += elapsed_ms
+    stats["fanout_ms_max"] = max(stats["fanout_ms_max"], elapsed_ms)
+
+def record_delivery(room_id: str, elapsed_ms: float):
+    """큐 적재부터 실제 전송 완료까지의 지연 기록"""
+    stats = room_stats.get(room_id)
+    if stats is None:
+        return
+    stats["deliveries"] += 1
+    stats["delivery_ms_sum"] += elapsed_ms
+    stats["delivery_ms_max"] = max(stats["delivery_ms_max"], elapsed_ms)
+
+def get_fanout_stats() -> dict:
+    """방별 fan-out 지연 통계 반환"""
+    result = {}
+    for room_id, s in room_stats.items():
+        result[room_id] = {
+            "broadcasts": s["broadcasts"],
+            "avg_recipients": round(s["recipients"] / s["broadcasts"], 1) if s["broadcasts"] else 0,
+            "fanout_ms_avg": round(s["fanout_ms_sum"] / s["broadcasts"], 3) if s["broadcasts"] else 0,
+            "fanout_ms_max": round(s["fanout_ms_max"], 3),
+            "delivery_ms_avg": round(s["delivery_ms_sum"] / s["deliveries"], 3) if s["deliveries"] else 0,
+            "delivery_ms_max": round(s["delivery_ms_max"], 3)
+        }
+    return result
+
+class ChatConnection:
+    """WebSocket별 송신 큐와 전용 writer 태스크"""
+
+    def __init__(self, websocket, user_id: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.dropped = 0
+        self.closed = False
+        self._queue = deque()
+        self._wakeup = asyncio.Event()
+        self._writer = asyncio.create_task(self._write_loop())
+
+    @property
+    def queued(self) -> int:
+        return len(self._queue)
+
+    def enqueue(self, frame: str, msg_type: str, room_id: str = None) -> bool:
+        """직렬화된 프레임을 송신 큐에 넣고 바로 반환"""
+        if self.closed:
+            return False
+
+        droppable = msg_type in DROPPABLE_TYPES
+        if len(self._queue) >= SEND_QUEUE_SIZE:
+            if droppable:
+                self.dropped += 1
+                return False
+
+            kept = deque(item for item in self._queue if not item[3])
+            self.dropped += len(self._queue) - len(kept)
+            self._queue = kept
+            if len(self._queue) >= SEND_QUEUE_SIZE:
+                logger.warning(f"[WebSocket 송신 지연] 사용자: {self.user_id} | 큐: {len(self._queue)} | 연결 종료")
+                self.close(SLOW_CONSUMER_CLOSE_CODE)
+                return False
+
+        self._queue.append((frame, room_id, time.perf_counter(), droppable))
+        self._wakeup.set()
+        return True
+
+    async def send_json(self, message: dict):
+        """websocket.send_json 호환 (큐를 거쳐 전송)"""
+        self.enqueue(encode_message(message), message.get("type"))
+
+    async def _write_loop(self):
+        try:
+            while True:
+                if not self._queue:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+
+                frame, room_id, queued_at, _ = self._queue.popleft()
+                await asyncio.wait_for(self.websocket.send_text(frame), SEND_TIMEOUT)
+                if room_id is not None:
+                    record_delivery(room_id, (time.perf_counter() - queued_at) * 1000)
+        except asyncio.CancelledError:
+            raise
+        except asyncio.TimeoutError:
+            logger.warning(f"[WebSocket 송신 시간 초과] 사용자: {self.user_id} | {SEND_TIMEOUT}초 | 연결 종료")
+            self.close(SLOW_CONSUMER_CLOSE_CODE)
+        except Exception as e:
+            logger.error(f"[WebSocket 송신 실패] 사용자: {self.user_id} | {e}")
+            self.closed = True
+            self._queue.clear()
+
+    def close(self, code: int = 1000):
+        """송신 중단 후 소켓 종료 (수신 루프는 연결 끊김으로 정리됨)"""
+        if self.closed:
+            return
+        self.closed = True
+        self._queue.clear()
+        self._writer.cancel()
+        asyncio.create_task(self._close_socket(code))
+
+    async def _close_socket(self, code: int):
+        try:
+            await asyncio.wait_for(self.websocket.close(code=code), CLOSE_TIMEOUT)
+        except Exception:
+            pass
+
+    def stop(self):
+        """핸들러 종료 시 writer 태스크 정리"""
+        self.closed = True
+        self._queue.clear()
+        self._writer.cancel()
@@ -5,12 +5,16 @@ from PIL import Image, ImageOps
 from fastapi import UploadFile
 import aiofiles
 from logger import logger
+from metrics import Counter
 
 UPLOAD_DIR = Path("server/uploads/chat")
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 CHUNK_SIZE = 500 * 1024
 
+_upload_bytes = Counter("dongin_upload_bytes_total", "업로드된 채팅 파일 바이트 수")
+_uploads = Counter("dongin_uploads_total", "업로드된 채팅 파일 수")
+
 async def save_chat_file(file: UploadFile, room_id: str, file_id: str) -> str:
     """파일 청크 업로드 저장"""
     room_dir = UPLOAD_DIR / room_id
@@ -25,6 +29,8 @@ async def save_chat_file(file: UploadFile, room_id: str, file_id: str) -> str:
             if not chunk:
                 break
             await f.write(chunk)
+            _upload_bytes.inc(len(chunk))
+    _uploads.inc()
 
     return str(file_path)
 
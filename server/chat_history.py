@@ -0,0 +1,83 @@
+import base64
+import os
+from sqlalchemy.orm import Session
+from models import ChatMessage, ChatRoomMember, User
+
+# (room_id, id) 키셋 페이지네이션: 깊이와 무관하게 인덱스 범위 스캔 1회
+CHAT_HISTORY_DEFAULT_LIMIT = int(os.getenv("CHAT_HISTORY_DEFAULT_LIMIT", "50"))
+CHAT_HISTORY_MAX_LIMIT = int(os.getenv("CHAT_HISTORY_MAX_LIMIT", "100"))
+CURSOR_VERSION = "v1"
+
+def encode_cursor(message_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{CURSOR_VERSION}:{message_id}".encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str) -> int:
+    """커서에서 메시지 ID 추출 (형식이 잘못되면 ValueError)"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+    except Exception:
+        raise ValueError("invalid cursor")
+    version, _, message_id = raw.partition(":")
+    if version != CURSOR_VERSION or not message_id.isdigit():
+        raise ValueError("invalid cursor")
+    return int(message_id)
+
+def get_read_state(db: Session, room_id: str) -> dict:
+    """멤버별 마지막으로 읽은 메시지 ID {user_id: last_read_id}"""
+    rows = db.query(ChatRoomMember.user_id, ChatRoomMember.last_read_id).filter(
+        ChatRoomMember.room_id == room_id
+    ).all()
+    return {user_id: last_read_id for user_id, last_read_id in rows}
+
+def fetch_page(db: Session, room_id: str, before_id: int = None, limit: int = CHAT_HISTORY_DEFAULT_LIMIT):
+    """before_id보다 오래된 메시지 limit개 (오래된 순)와 다음 페이지 커서 반환"""
+    limit = max(1, min(limit, CHAT_HISTORY_MAX_LIMIT))
+    query = db.query(
+        ChatMessage.id,
+        ChatMessage.room_id,
+        ChatMessage.user_id,
+        User.name.label("user_name"),
+        ChatMessage.content,
+        ChatMessage.type,
+        ChatMessage.file_id,
+        ChatMessage.reply_to,
+        ChatMessage.created_at
+    ).join(User, User.id == ChatMessage.user_id).filter(ChatMessage.room_id == room_id)
+    if before_id is not None:
+        query = query.filter(ChatMessage.id < before_id)
+
+    # 한 건 더 읽어 다음 페이지 유무 판단
+    rows = query.order_by(ChatMessage.id.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    rows.reverse()
+
+    messages = [
+        {
+            "id": r.id,
+            "room_id": r.room_id,
+            "user_id": r.user_id,
+            "user_name": r.user_name,
+            "content": r.content,
+            "type": r.type,
+            "file_id": r.file_id,
+            "reply_to": r.reply_to,
+            "created_at": r.created_at.isoformat()
+        }
+        for r in rows
+    ]
+    next_cursor = encode_cursor(rows[0].id) if has_more else None
+    return messages, next_cursor
+
+def get_history(db: Session, room_id: str, user_id: int, cursor: str = None, limit: int = CHAT_HISTORY_DEFAULT_LIMIT):
+    """멤버가 아니면 None, 커서가 잘못되면 ValueError"""
+    before_id = decode_cursor(cursor) if cursor else None
+    read_state = get_read_state(db, room_id)
+    if user_id not in read_state:
+        return None
+    messages, next_cursor = fetch_page(db, room_id, before_id, limit)
+    return {
+        "messages": messages,
+        "next_cursor": next_cursor,
+        "read_state": read_state
+    }
@@ -1,19 +1,60 @@
+import time
 from sqlalchemy.orm import Session
-from models import ChatMessage, ChatRoomMember, ChatFile, User, ChatReadReceipt
+from models import ChatMessage, ChatRoomMember, ChatFile, ChatReadReceipt
+from auth import CurrentUser
+import presence
+from database import run_db, db_session
 from logger import logger
+from chat_rooms import record_message, update_read_offset
+from chat_broadcast import create_backend
+from chat_connection import encode_message, record_fanout, get_fanout_stats
+from metrics import Counter, Gauge, HistogramMetric
 
 active_connections = {}
 user_connections = {}
+broadcast_backend = create_backend()
+
+Gauge("dongin_ws_connections", "전체 WebSocket 연결 수",
+      lambda: sum(len(conns) for conns in user_connections.values()))
+Gauge("dongin_ws_room_connections", "채팅방별 WebSocket 연결 수",
+      lambda: {(room_id,): len(conns) for room_id, conns in active_connections.items()}, ("room",))
+_messages_total = Counter("dongin_chat_messages_total", "저장된 채팅 메시지 수", ("type",))
+_fanout_seconds = HistogramMetric("dongin_chat_fanout_seconds", "방 브로드캐스트 1회의 큐 적재 시간")
+
+async def start_broadcast():
+    """브로드캐스트 백엔드 시작"""
+    await broadcast_backend.start(deliver_event)
+
+async def stop_broadcast():
+    """브로드캐스트 백엔드 종료"""
+    await broadcast_backend.stop()
+
+async def deliver_event(event: dict):
+    """현재 워커에 연결된 소켓으로 이벤트 전달"""
+    if event["kind"] == "room":
+        await _send_to_room(event["room_id"], event["frame"], event["type"], event.get("exclude_user_id"))
+    elif event["kind"] == "users":
+        await _send_to_users(event["user_ids"], event["frame"], event["type"])
+
+def _room_event(room_id: str, message: dict, exclude_user_id: int = None) -> dict:
+    # 수신자 수와 무관하게 한 번만 직렬화 (다른 워커도 같은 프레임을 그대로 전송)
+    return {
+        "kind": "room",
+        "room_id": room_id,
+        "exclude_user_id": exclude_user_id,
+        "type": message["type"],
+        "frame": encode_message(message)
+    }
 
 async def get_room_connections(room_id: str):
     """채팅방의 모든 연결 반환"""
     return active_connections.get(room_id, {})
 
-async def register_connection(room_id: str, user_id: int, websocket):
+async def register_connection(room_id: str, user_id: int, connection):
     """채팅방에 연결 등록"""
     if room_id not in active_connections:
         active_connections[room_id] = {}
-    active_connections[room_id][user_id] = websocket
+    active_connections[room_id][user_id] = connection
     logger.info(f"[WebSocket 연결] 방: {room_id} | 사용자: {user_id}")
 
 async def unregister_connection(room_id: str, user_id: int):
@@ -24,8 +65,23 @@ async def unregister_connection(room_id: str, user_id: int):
             del active_connections[room_id]
         logger.info(f"[WebSocket 해제] 방: {room_id} | 사용자: {user_id}")
 
-async def handle_message(data: dict, user: User, room_id: str, websocket, db: Session):
-    """텍스트 메시지 처리"""
+def save_message(db: Session, message: ChatMessage, chat_file: ChatFile = None) -> ChatMessage:
+    """메시지, 보낸 사람 읽음 확인, 방 요약을 한 트랜잭션으로 저장"""
+    db.add(message)
+    db.flush()
+
+    db.add(ChatReadReceipt(message_id=message.id, user_id=message.user_id))
+    if chat_file is not None:
+        chat_file.message_id = message.id
+    record_message(db, message)
+    db.commit()
+    db.refresh(message)
+    if chat_file is not None:
+        db.refresh(chat_file)
+    return message
+
+async def handle_message(data: dict, user: CurrentUser, room_id: str, websocket):
+    """텍스트 메시지 처리 (세션은 저장 후 바로 반납하고 브로드캐스트)"""
     logger.info(f"[handle_message] 사용자: {user.id} | 방: {room_id}")
     if not room_id:
         logger.error(f"[handle_message 실패] 사용자: {user.id} | 방 ID 없음")
@@ -42,32 +98,30 @@ async def handle_message(data: dict, user: User, room_id: str, websocket, db: Se
         type="text",
         reply_to=reply_to
     )
-    db.add(message)
-    db.commit()
-    db.refresh(message)
+    async with db_session() as db:
+        await run_db(save_message, db, message)
+        payload = {
+            "type": "message",
+            "data": {
+                "id": message.id,
+                "room_id": message.room_id,
+                "user_id": message.user_id,
+                "user_name": user.name,
+                "content": message.content,
+                "type": "text",
+                "file_id": None,
+                "created_at": message.created_at.isoformat(),
+                "read_by": []
+            }
+        }
+    _messages_total.inc(labels=("text",))
 
-    db.add(ChatReadReceipt(message_id=message.id, user_id=user.id))
-    db.commit()
+    logger.info(f"[메시지 저장] ID: {payload['data']['id']} | 방: {room_id} | 사용자: {user.id}")
 
-    logger.info(f"[메시지 저장] ID: {message.id} | 방: {room_id} | 사용자: {user.id}")
-
-    await broadcast_message(room_id, {
-        "type": "message",
-        "data": {
-            "id": message.id,
-            "room_id": message.room_id,
-            "user_id": message.user_id,
-            "user_name": user.name,
-            "content": message.content,
-            "type": "text",
-            "file_id": None,
-            "created_at": message.created_at.isoformat(),
-            "read_by": []
-        }
-    })
+    await broadcast_message(room_id, payload)
 
-async def handle_file_message(data: dict, user: User, room_id: str, websocket, db: Session):
-    """파일 메시지 처리"""
+async def handle_file_message(data: dict, user: CurrentUser, room_id: str, websocket):
+    """파일 메시지 처리 (세션은 저장 후 바로 반납하고 브로드캐스트)"""
     if not room_id:
         await websocket.send_json({"type": "error", "message": "채팅방에 입장하지 않음"})
         return
@@ -75,142 +129,162 @@ async def handle_file_message(data: dict, user: User, room_id: str, websocket, d
     file_id = data.get("file_id")
     metadata = data.get("metadata", {})
 
-    chat_file = db.query(ChatFile).filter(ChatFile.id == file_id).first()
-    if not chat_file:
+    async with db_session() as db:
+        chat_file = await run_db(db.query(ChatFile).filter(ChatFile.id == file_id).first)
+        if not chat_file:
+            payload = None
+        else:
+            message = ChatMessage(
+                room_id=room_id,
+                user_id=user.id,
+                content=metadata.get("caption"),
+                type="file",
+                file_id=file_id
+            )
+            await run_db(save_message, db, message, chat_file)
+            payload = {
+                "type": "message",
+                "data": {
+                    "id": message.id,
+                    "room_id": message.room_id,
+                    "user_id": message.user_id,
+                    "user_name": user.name,
+                    "content": message.content,
+                    "type": "file",
+                    "file_id": file_id,
+                    "file_info": {
+                        "filename": chat_file.filename,
+                        "mime_type": chat_file.mime_type,
+                        "size": chat_file.size,
+                        "thumbnail": chat_file.thumbnail_path
+                    },
+                    "created_at": message.created_at.isoformat(),
+                    "read_by": []
+                }
+            }
+    if payload is None:
         await websocket.send_json({"type": "error", "message": "파일 없음"})
         return
+    _messages_total.inc(labels=("file",))
 
-    message = ChatMessage(
-        room_id=room_id,
-        user_id=user.id,
-        content=metadata.get("caption"),
-        type="file",
-        file_id=file_id
-    )
-    db.add(message)
-    db.commit()
-    db.refresh(message)
-
-    db.add(ChatReadReceipt(message_id=message.id, user_id=user.id))
-    db.commit()
-
-    chat_file.message_id = message.id
-    db.commit()
-
-    await broadcast_message(room_id, {
-        "type": "message",
-        "data": {
-            "id": message.id,
-            "room_id": message.room_id,
-            "user_id": message.user_id,
-            "user_name": user.name,
-            "content": message.content,
-            "type": "file",
-            "file_id": file_id,
-            "file_info": {
-                "filename": chat_file.filename,
-                "mime_type": chat_file.mime_type,
-                "size": chat_file.size,
-                "thumbnail": chat_file.thumbnail_path
-            },
-            "created_at": message.created_at.isoformat(),
-            "read_by": []
-        }
-    })
+    await broadcast_message(room_id, payload)
 
 async def broadcast_message(room_id: str, message: dict):
     """채팅방 멤버에게 메시지 브로드캐스트"""
-    connections = await get_room_connections(room_id)
-    logger.info(f"[broadcast_message] 방: {room_id} | 연결된 사용자: {list(connections.keys())}")
-
-    for user_id, ws in connections.items():
-        try:
-            await ws.send_json(message)
-            logger.info(f"[브로드캐스트 성공] 방: {room_id} | 사용자: {user_id}")
-        except Exception as e:
-            logger.error(f"[브로드캐스트 실패] 방: {room_id} | 사용자: {user_id} | {e}")
+    await broadcast_backend.publish(_room_event(room_id, message))
 
 async def broadcast_typing(room_id: str, user_id: int, status: str):
     """타이핑 상태 브로드캐스트"""
-    connections = await get_room_connections(room_id)
-
-    for uid, ws in connections.items():
-        if uid != user_id:
-            try:
-                await ws.send_json({
-                    "type": "typing",
-                    "data": {"user_id": user_id, "status": status}
-                })
-            except:
-                pass
+    await broadcast_backend.publish(_room_event(room_id, {
+        "type": "typing",
+        "data": {"user_id": user_id, "status": status}
+    }, exclude_user_id=user_id))
 
 async def broadcast_read_receipt(room_id: str, read_data: dict):
     """읽음 확인 브로드캐스트"""
-    connections = await get_room_connections(room_id)
-
-    for user_id, ws in connections.items():
-        try:
-            await ws.send_json({
-                "type": "read",
-                "data": read_data
-            })
-        except:
-            pass
-
-async def handle_read(data: dict, user: User, room_id: str, db: Session):
-    """읽음 확인 처리 (WebSocket 버전)"""
-    message_ids = data.get("message_ids", [])
+    await broadcast_backend.publish(_room_event(room_id, {
+        "type": "read",
+        "data": read_data
+    }))
 
+async def _send_to_room(room_id: str, frame: str, msg_type: str, exclude_user_id: int = None):
+    connections = await get_room_connections(room_id)
+    if msg_type == "message":
+        logger.info(f"[broadcast_message] 방: {room_id} | 연결된 사용자: {list(connections.keys())}")
+
+    start = time.perf_counter()
+    recipients = 0
+    for user_id, conn in list(connections.items()):
+        if user_id == exclude_user_id:
+            continue
+        conn.enqueue(frame, msg_type, room_id)
+        recipients += 1
+    elapsed = time.perf_counter() - start
+    record_fanout(room_id, recipients, elapsed * 1000)
+    _fanout_seconds.observe(elapsed)
+
+def save_read_receipts(db: Session, room_id: str, user_id: int, message_ids: list) -> bool:
+    """읽음 처리 저장 (채팅방 멤버가 아니면 False)"""
     member = db.query(ChatRoomMember).filter(
         ChatRoomMember.room_id == room_id,
-        ChatRoomMember.user_id == user.id
+        ChatRoomMember.user_id == user_id
     ).first()
+    if not member:
+        return False
+    if not message_ids:
+        return True
+
+    max_id = max(message_ids)
+    if not member.last_read_id or max_id > member.last_read_id:
+        member.last_read_id = max_id
+        update_read_offset(db, member)
+
+    for msg_id in message_ids:
+        existing = db.query(ChatReadReceipt).filter(
+            ChatReadReceipt.message_id == msg_id,
+            ChatReadReceipt.user_id == user_id
+        ).first()
+        if not existing:
+            db.add(ChatReadReceipt(message_id=msg_id, user_id=user_id))
 
-    if member and message_ids:
-        max_id = max(message_ids)
-        if not member.last_read_id or max_id > member.last_read_id:
-            member.last_read_id = max_id
-
-        for msg_id in message_ids:
-            existing = db.query(ChatReadReceipt).filter(
-                ChatReadReceipt.message_id == msg_id,
-                ChatReadReceipt.user_id == user.id
-            ).first()
-            if not existing:
-                db.add(ChatReadReceipt(message_id=msg_id, user_id=user.id))
+    db.commit()
+    return True
 
-        db.commit()
+async def handle_read(data: dict, user: CurrentUser, room_id: str):
+    """읽음 확인 처리 (WebSocket 버전)"""
+    message_ids = data.get("message_ids", [])
 
+    async with db_session() as db:
+        saved = await run_db(save_read_receipts, db, room_id, user.id, message_ids)
+    if saved and message_ids:
         await broadcast_read_receipt(room_id, {
             "user_id": user.id,
             "message_ids": message_ids
         })
 
-async def register_user_connection(user_id: int, websocket):
-    if user_id not in user_connections:
-        user_connections[user_id] = []
-    if websocket not in user_connections[user_id]:
-        user_connections[user_id].append(websocket)
-    logger.info(f"[전역 연결 등록] 사용자: {user_id} | 연결 수: {len(user_connections[user_id])}")
+async def register_user_connection(user: CurrentUser, connection):
+    if user.id not in user_connections:
+        user_connections[user.id] = []
+    if connection not in user_connections[user.id]:
+        user_connections[user.id].append(connection)
+        presence.connect(user)
+    logger.info(f"[전역 연결 등록] 사용자: {user.id} | 연결 수: {len(user_connections[user.id])}")
 
-async def unregister_user_connection(user_id: int, websocket):
+async def unregister_user_connection(user_id: int, connection):
     if user_id in user_connections:
-        if websocket in user_connections[user_id]:
-            user_connections[user_id].remove(websocket)
+        if connection in user_connections[user_id]:
+            user_connections[user_id].remove(connection)
+            presence.disconnect(user_id)
         if not user_connections[user_id]:
             del user_connections[user_id]
         logger.info(f"[전역 연결 해제] 사용자: {user_id}")
 
 async def broadcast_to_users(user_ids: list, message: dict):
+    """지정한 사용자들의 모든 연결로 브로드캐스트"""
+    await broadcast_backend.publish({
+        "kind": "users",
+        "user_ids": user_ids,
+        "type": message["type"],
+        "frame": encode_message(message)
+    })
+
+async def _send_to_users(user_ids: list, frame: str, msg_type: str):
     logger.info(f"[브로드캐스트 시작] 대상: {user_ids} | user_connections: {list(user_connections.keys())}")
     for user_id in user_ids:
         if user_id in user_connections:
-            logger.info(f"[브로드캐스트] 사용자 {user_id} | 연결 수: {len(user_connections[user_id])}")
-            for ws in user_connections[user_id]:
-                try:
-                    await ws.send_json(message)
-                    logger.info(f"[브로드캐스트 성공] 사용자: {user_id}")
-                except Exception as e:
-                    logger.error(f"[브로드캐스트 실패] 사용자: {user_id} | {e}")
+            for conn in list(user_connections[user_id]):
+                conn.enqueue(frame, msg_type)
         else:
             logger.warning(f"[브로드캐스트 건너뜀] 사용자 {user_id} 연결 없음")
+
+def get_stats() -> dict:
+    """채팅 연결/브로드캐스트 통계"""
+    connections = [c for conns in user_connections.values() for c in conns]
+    return {
+        "backend": broadcast_backend.name,
+        "connections": len(connections),
+        "room_connections": {room_id: len(conns) for room_id, conns in active_connections.items()},
+        "dropped_events": sum(c.dropped for c in connections),
+        "queued_events": sum(c.queued for c in connections),
+        "rooms": get_fanout_stats()
+    }
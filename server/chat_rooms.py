@@ -0,0 +1,133 @@
+from sqlalchemy import and_, case, func
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from models import ChatRoom, ChatRoomMember, ChatRoomSummary, ChatMessage, User
+
+PREVIEW_LENGTH = 50
+
+def _preview(content):
+    return content[:PREVIEW_LENGTH] if content is not None else None
+
+def get_room_list(db: Session, user_id: int) -> list:
+    """사용자의 채팅방 목록 조회 (방 개수와 무관하게 쿼리 2회)"""
+    rows = db.query(
+        ChatRoom.id,
+        ChatRoom.name,
+        ChatRoom.type,
+        ChatRoom.updated_at,
+        ChatRoomSummary.last_message_preview,
+        ChatRoomSummary.message_count,
+        ChatRoomMember.read_offset
+    ).join(ChatRoomMember, and_(
+        ChatRoomMember.room_id == ChatRoom.id,
+        ChatRoomMember.user_id == user_id
+    )).outerjoin(
+        ChatRoomSummary, ChatRoomSummary.room_id == ChatRoom.id
+    ).order_by(ChatRoom.updated_at.desc()).all()
+
+    if not rows:
+        return []
+
+    # 전체 방의 멤버를 한 번에 조회
+    members_by_room = {}
+    member_rows = db.query(ChatRoomMember.room_id, User.id, User.name).join(
+        User, User.id == ChatRoomMember.user_id
+    ).filter(ChatRoomMember.room_id.in_([r.id for r in rows])).all()
+    for room_id, uid, name in member_rows:
+        members_by_room.setdefault(room_id, []).append({"id": uid, "name": name})
+
+    return [
+        {
+            "id": r.id,
+            "name": r.name,
+            "type": r.type,
+            "members": members_by_room.get(r.id, []),
+            "last_message": r.last_message_preview,
+            "unread_count": max((r.message_count or 0) - (r.read_offset or 0), 0),
+            "updated_at": r.updated_at
+        }
+        for r in rows
+    ]
+
+def record_message(db: Session, message: ChatMessage):
+    """메시지 저장과 같은 트랜잭션에서 방 요약 갱신 (flush 이후 호출)"""
+    stmt = pg_insert(ChatRoomSummary).values(
+        room_id=message.room_id,
+        last_message_id=message.id,
+        last_message_preview=_preview(message.content),
+        last_message_at=func.now(),
+        message_count=1
+    )
+    newer = stmt.excluded.last_message_id > func.coalesce(ChatRoomSummary.last_message_id, 0)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[ChatRoomSummary.room_id],
+        set_={
+            "last_message_id": case((newer, stmt.excluded.last_message_id), else_=ChatRoomSummary.last_message_id),
+            "last_message_preview": case((newer, stmt.excluded.last_message_preview), else_=ChatRoomSummary.last_message_preview),
+            "last_message_at": case((newer, stmt.excluded.last_message_at), else_=ChatRoomSummary.last_message_at),
+            "message_count": ChatRoomSummary.message_count + 1
+        }
+    )
+    db.execute(stmt)
+
+def update_read_offset(db: Session, member: ChatRoomMember):
+    """last_read_id 기준으로 읽은 메시지 수(read_offset) 갱신"""
+    if not member.last_read_id:
+        return
+
+    summary = db.query(ChatRoomSummary).filter(ChatRoomSummary.room_id == member.room_id).first()
+    if summary and summary.last_message_id and member.last_read_id >= summary.last_message_id:
+        # 마지막 메시지까지 읽은 경우 COUNT 없이 처리
+        member.read_offset = summary.message_count
+        return
+
+    member.read_offset = db.query(func.count(ChatMessage.id)).filter(
+        ChatMessage.room_id == member.room_id,
+        ChatMessage.id <= member.last_read_id
+    ).scalar()
+
+def rebuild_summaries(db: Session, room_ids: list = None) -> int:
+    """기존 메시지로부터 방 요약과 멤버 읽음 오프셋 재생성 (room_ids를 주면 해당 방만)"""
+    messages = db.query(
+        ChatMessage.room_id,
+        ChatMessage.id,
+        ChatMessage.content,
+        ChatMessage.created_at,
+        func.row_number().over(
+            partition_by=ChatMessage.room_id,
+            order_by=(ChatMessage.created_at.desc(), ChatMessage.id.desc())
+        ).label("rn"),
+        func.count(ChatMessage.id).over(partition_by=ChatMessage.room_id).label("cnt")
+    )
+    summaries = db.query(ChatRoomSummary)
+    members = db.query(ChatRoomMember)
+    if room_ids is not None:
+        messages = messages.filter(ChatMessage.room_id.in_(room_ids))
+        summaries = summaries.filter(ChatRoomSummary.room_id.in_(room_ids))
+        members = members.filter(ChatRoomMember.room_id.in_(room_ids))
+    ranked = messages.subquery()
+    rows = db.query(ranked).filter(ranked.c.rn == 1).all()
+
+    summaries.delete(synchronize_session=False)
+    db.bulk_insert_mappings(ChatRoomSummary, [
+        {
+            "room_id": r.room_id,
+            "last_message_id": r.id,
+            "last_message_preview": _preview(r.content),
+            "last_message_at": r.created_at,
+            "message_count": r.cnt
+        }
+        for r in rows
+    ])
+
+    read_count = db.query(func.count(ChatMessage.id)).filter(
+        ChatMessage.room_id == ChatRoomMember.room_id,
+        ChatMessage.id <= func.coalesce(ChatRoomMember.last_read_id, 0)
+    ).scalar_subquery()
+    members.update(
+        {ChatRoomMember.read_offset: read_count},
+        synchronize_session=False
+    )
+
+    db.commit()
+    return len(rows)
@@ -1,13 +1,17 @@
 from fastapi import WebSocket, WebSocketDisconnect
-from sqlalchemy.orm import Session
 import asyncio
 from jose import jwt
-from auth import SECRET_KEY, ALGORITHM
-from models import User, ChatRoomMember
+from auth import SECRET_KEY, ALGORITHM, load_current_user
+from models import ChatRoomMember
+from database import run_db, db_session
 from logger import logger
 import chat_manager
+import loop_monitor
+from chat_connection import ChatConnection
 
-async def authenticate_websocket(token: str, db: Session):
+WS_MESSAGE_TYPES = {"pong", "join", "join_room", "message", "file", "typing", "read"}
+
+async def authenticate_websocket(token: str):
     """JWT 토큰으로 사용자 인증"""
     try:
         if token.startswith("Bearer "):
@@ -16,7 +20,8 @@ async def authenticate_websocket(token: str, db: Session):
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
         username = payload.get("sub")
 
-        user = db.query(User).filter(User.username == username).first()
+        async with db_session() as db:
+            user = await run_db(load_current_user, username, db)
         if not user or not user.is_active:
             return None
         return user
@@ -33,10 +38,11 @@ async def heartbeat_monitor(websocket: WebSocket):
     except:
         pass
 
-async def handle_websocket_chat(websocket: WebSocket, db: Session):
-    """WebSocket 채팅 핸들러"""
+async def handle_websocket_chat(websocket: WebSocket):
+    """WebSocket 채팅 핸들러 (DB 세션은 메시지 단위로 사용 후 즉시 반납)"""
     await websocket.accept()
     user = None
+    connection = None
     current_room_id = None
 
     try:
@@ -62,20 +68,24 @@ async def handle_websocket_chat(websocket: WebSocket, db: Session):
             await websocket.close()
             return
 
-        user = await authenticate_websocket(data.get("token"), db)
+        user = await authenticate_websocket(data.get("token"))
         if not user:
             await websocket.send_json({"type": "error", "message": "인증 실패"})
             await websocket.close()
             return
 
         await websocket.send_json({"type": "auth_success", "user_id": user.id})
-        await chat_manager.register_user_connection(user.id, websocket)
 
-        heartbeat_task = asyncio.create_task(heartbeat_monitor(websocket))
+        # 인증 이후 송신은 모두 연결별 송신 큐를 거침
+        connection = ChatConnection(websocket, user.id)
+        await chat_manager.register_user_connection(user, connection)
+
+        heartbeat_task = asyncio.create_task(heartbeat_monitor(connection))
 
         while True:
             data = await websocket.receive_json()
             msg_type = data.get("type")
+            loop_monitor.set_activity(f"ws:{msg_type if msg_type in WS_MESSAGE_TYPES else 'unknown'}")
 
             if msg_type == "pong":
                 continue
@@ -84,44 +94,46 @@ async def handle_websocket_chat(websocket: WebSocket, db: Session):
                 room_id = data.get("room_id")
                 logger.info(f"[join_room 요청] 사용자: {user.id} | 방: {room_id}")
 
-                member = db.query(ChatRoomMember).filter(
-                    ChatRoomMember.room_id == room_id,
-                    ChatRoomMember.user_id == user.id
-                ).first()
+                async with db_session() as db:
+                    member = await run_db(db.query(ChatRoomMember).filter(
+                        ChatRoomMember.room_id == room_id,
+                        ChatRoomMember.user_id == user.id
+                    ).first)
                 if not member:
                     logger.warning(f"[join_room 실패] 사용자: {user.id} | 방: {room_id} | 권한 없음")
-                    await websocket.send_json({"type": "error", "message": "권한 없음"})
+                    await connection.send_json({"type": "error", "message": "권한 없음"})
                     continue
 
                 if current_room_id:
                     await chat_manager.unregister_connection(current_room_id, user.id)
 
                 current_room_id = room_id
-                await chat_manager.register_connection(room_id, user.id, websocket)
+                await chat_manager.register_connection(room_id, user.id, connection)
                 logger.info(f"[join_room 완료] 사용자: {user.id} | 방: {room_id}")
-                await websocket.send_json({"type": "joined", "room_id": room_id})
+                await connection.send_json({"type": "joined", "room_id": room_id})
 
             elif msg_type == "message":
                 logger.info(f"[메시지 수신] 사용자: {user.id} | 방: {current_room_id}")
-                await chat_manager.handle_message(data, user, current_room_id, websocket, db)
+                await chat_manager.handle_message(data, user, current_room_id, connection)
 
             elif msg_type == "file":
-                await chat_manager.handle_file_message(data, user, current_room_id, websocket, db)
+                await chat_manager.handle_file_message(data, user, current_room_id, connection)
 
             elif msg_type == "typing":
                 await chat_manager.broadcast_typing(current_room_id, user.id, data.get("status"))
 
             elif msg_type == "read":
-                await chat_manager.handle_read(data, user, current_room_id, db)
+                await chat_manager.handle_read(data, user, current_room_id)
 
     except WebSocketDisconnect:
         logger.info(f"[WebSocket 끊김] 사용자: {user.id if user else 'unknown'}")
     except Exception as e:
         logger.error(f"[WebSocket 오류] {e}", exc_info=True)
     finally:
-        if user:
-            await chat_manager.unregister_user_connection(user.id, websocket)
-        if user and current_room_id:
+        if connection:
+            await chat_manager.unregister_user_connection(user.id, connection)
+            connection.stop()
+        if connection and current_room_id:
             await chat_manager.unregister_connection(current_room_id, user.id)
         if 'heartbeat_task' in locals():
             heartbeat_task.cancel()
@@ -0,0 +1,99 @@
+import asyncio
+import json
+import sys
+
+# 부하 테스트용 가짜 Ollama 서버 (/api/tags, /api/chat 스트리밍만 흉내)
+# 사용법: python fake_ollama.py [포트 목록 예: 11434,11435] [토큰 수] [토큰 간격(초)]
+# 여러 포트를 지정하면 포트마다 1대씩 실행 (OLLAMA_BACKENDS 테스트용)
+
+MODEL = "deepseek-r1:14b"
+
+class FakeOllama:
+    def __init__(self, host: str = "127.0.0.1", port: int = 11434, tokens: int = 20, delay: float = 0.02):
+        self.host = host
+        self.port = port
+        self.tokens = tokens
+        self.delay = delay
+        self.active = 0
+        self.max_active = 0
+        self.requests = 0
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self):
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader, writer):
+        try:
+            request_line = (await reader.readline()).decode()
+            method, path, _ = request_line.split(" ", 2)
+            length = 0
+            while True:
+                line = (await reader.readline()).decode().strip()
+                if not line:
+                    break
+                name, _, value = line.partition(":")
+                if name.lower() == "content-length":
+                    length = int(value)
+            if length:
+                await reader.readexactly(length)
+
+            if method == "GET" and path == "/api/tags":
+                await self._send_json(writer, {"models": [{"name": MODEL}]})
+            elif method == "POST" and path == "/api/chat":
+                await self._stream_chat(writer)
+            else:
+                writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\nConnection: close\r\n\r\n")
+            await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def _send_json(self, writer, body: dict):
+        data = json.dumps(body).encode()
+        writer.write(
+            b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+            + f"Content-Length: {len(data)}\r\nConnection: close\r\n\r\n".encode()
+            + data
+        )
+
+    async def _stream_chat(self, writer):
+        self.requests += 1
+        self.active += 1
+        self.max_active = max(self.max_active, self.active)
+        try:
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\nTransfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+            for i in range(self.tokens):
+                await asyncio.sleep(self.delay)
+                self._write_chunk(writer, {"model": MODEL, "message": {"role": "assistant", "content": f"토큰{i} "}, "done": False})
+                await writer.drain()
+            self._write_chunk(writer, {"model": MODEL, "message": {"role": "assistant", "content": ""}, "done": True})
+            writer.write(b"0\r\n\r\n")
+        finally:
+            self.active -= 1
+
+    def _write_chunk(self, writer, body: dict):
+        data = (json.dumps(body, ensure_ascii=False) + "\n").encode()
+        writer.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+
+async def main():
+    ports = [int(p) for p in (sys.argv[1] if len(sys.argv) > 1 else "11434").split(",")]
+    tokens = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 0.02
+    for port in ports:
+        server = FakeOllama(port=port, tokens=tokens, delay=delay)
+        await server.start()
+        print(f"가짜 Ollama 실행 중: {server.base_url} | 토큰: {tokens} | 간격: {delay}초")
+    await asyncio.Event().wait()
+
+if __name__ == "__main__":
+    asyncio.run(main())
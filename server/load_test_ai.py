@@ -0,0 +1,78 @@
+import asyncio
+import random
+import sys
+import time
+import ai_engine
+from ai_scheduler import AiScheduler
+from fake_ollama import FakeOllama
+
+# AI 스케줄러/백엔드 풀 부하 테스트: 가짜 Ollama 여러 대에 대해 사용자 N명이 동시에 요청
+# 사용법: python load_test_ai.py [사용자 수] [정책 fifo|fair] [백엔드 한도 목록 예: 2,1]
+
+USERS = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+POLICY = sys.argv[2] if len(sys.argv) > 2 else "fifo"
+LIMITS = [int(x) for x in (sys.argv[3] if len(sys.argv) > 3 else "2,1").split(",")]
+CANCEL_RATIO = 0.1
+
+async def client(scheduler: AiScheduler, user_id: int, cancel_at: int, result: dict):
+    job = scheduler.submit(user_id)
+    try:
+        async for position in scheduler.wait(job):
+            result["updates"] += 1
+            if cancel_at and position is not None and position <= cancel_at:
+                # 대기 중 연결이 끊긴 클라이언트 흉내
+                result["cancelled"] += 1
+                return
+        async for chunk in ai_engine.chat_stream("부하 테스트", None):
+            if chunk["done"]:
+                result["completed"] += 1
+    finally:
+        scheduler.release(job)
+
+async def main():
+    fakes = [FakeOllama(port=0) for _ in LIMITS]
+    for fake in fakes:
+        await fake.start()
+
+    scheduler = AiScheduler(policy=POLICY)
+    ai_engine.set_backends(",".join(f"{fake.base_url}|{limit}" for fake, limit in zip(fakes, LIMITS)))
+    await ai_engine.start(scheduler.set_slots)
+    await ai_engine.check_status(force=True)
+
+    result = {"updates": 0, "completed": 0, "cancelled": 0}
+    cancel_users = set(random.sample(range(USERS), int(USERS * CANCEL_RATIO)))
+
+    print("=" * 50)
+    print(f"AI 부하 테스트 | 사용자: {USERS} | 정책: {POLICY} | 백엔드 한도: {LIMITS} | 슬롯: {scheduler.slots}")
+    print("=" * 50)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        client(scheduler, user_id, random.randint(1, 5) if user_id in cancel_users else 0, result)
+        for user_id in range(USERS)
+    ))
+    elapsed = time.perf_counter() - started
+
+    await ai_engine.stop()
+    for fake in fakes:
+        await fake.stop()
+
+    stats = scheduler.stats()
+    print(f"소요 시간: {elapsed:.2f}초")
+    print(f"완료: {result['completed']} | 대기 중 취소: {result['cancelled']}")
+    print(f"순번 알림 수: {result['updates']} (요청당 {result['updates'] / USERS:.1f})")
+    for fake, limit in zip(fakes, LIMITS):
+        print(f"{fake.base_url} | 처리: {fake.requests} | 최대 동시: {fake.max_active} (한도 {limit})")
+    print(f"대기 시간 평균: {stats['wait_ms_avg']}ms | 최대: {stats['wait_ms_max']}ms")
+
+    ok = (
+        all(fake.max_active <= limit for fake, limit in zip(fakes, LIMITS))
+        and scheduler.slots == sum(LIMITS)
+        and result["completed"] + result["cancelled"] == USERS
+        and stats["running"] == 0 and stats["waiting"] == 0
+    )
+    print("✅ 통과" if ok else "❌ 실패")
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    asyncio.run(main())
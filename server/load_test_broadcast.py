@@ -0,0 +1,150 @@
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+import httpx
+import websockets
+
+# 인스턴스 간 채팅 fan-out 지연 측정: CHAT_BROADCAST_BACKEND=postgres로 서버 N개를 포트별로 띄우고
+# 같은 채팅방 사용자들을 인스턴스에 나눠 접속시킨 뒤, 한 명이 보낸 메시지의 수신 지연을 같은/다른 인스턴스별로 집계
+# 사용법: python load_test_broadcast.py [인스턴스 수] [사용자 수] [메시지 수] [시작 포트]
+# DATABASE_URL이 가리키는 DB와 테스트 계정(admin/admin)이 필요, 벤치마크 사용자(bench_ws_*)는 끝난 뒤 삭제
+
+INSTANCES = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+USERS = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+MESSAGES = int(sys.argv[3]) if len(sys.argv) > 3 else 50
+BASE_PORT = int(sys.argv[4]) if len(sys.argv) > 4 else 18000
+SEND_INTERVAL = 0.05
+PASSWORD = "bench-password"
+
+def start_instances() -> list:
+    env = {**os.environ, "CHAT_BROADCAST_BACKEND": "postgres", "LOOP_MONITOR_ENABLED": "false"}
+    return [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(BASE_PORT + i), "--log-level", "critical"],
+            cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+        )
+        for i in range(INSTANCES)
+    ]
+
+async def wait_ready(http: httpx.AsyncClient, port: int):
+    for _ in range(100):
+        try:
+            if (await http.get(f"http://127.0.0.1:{port}/health")).status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        await asyncio.sleep(0.2)
+    raise SystemExit(f"인스턴스 시작 실패: 포트 {port}")
+
+async def login(http: httpx.AsyncClient, username: str, password: str) -> str:
+    response = await http.post(f"http://127.0.0.1:{BASE_PORT}/api/auth/login", data={"username": username, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def prepare_users(http: httpx.AsyncClient, admin: dict) -> list:
+    existing = {u["username"]: u["id"] for u in (await http.get(f"http://127.0.0.1:{BASE_PORT}/api/users", headers=admin)).json()}
+    users = []
+    for i in range(USERS):
+        username = f"bench_ws_{i:03d}"
+        if username not in existing:
+            response = await http.post(f"http://127.0.0.1:{BASE_PORT}/api/users", headers=admin, json={
+                "username": username, "name": f"벤치마크{i}", "position": "테스트", "password": PASSWORD
+            })
+            response.raise_for_status()
+            existing[username] = response.json()["id"]
+        users.append((username, existing[username]))
+    return users
+
+async def client(index: int, token: str, room_id: str, sent: dict, latencies: dict, ready: asyncio.Event, joined: list):
+    instance = index % INSTANCES
+    async with websockets.connect(f"ws://127.0.0.1:{BASE_PORT + instance}/ws/chat") as ws:
+        await ws.send(json.dumps({"type": "auth", "token": token}))
+        await ws.recv()
+        await ws.send(json.dumps({"type": "join_room", "room_id": room_id}))
+        while json.loads(await ws.recv()).get("type") != "joined":
+            pass
+        joined.append(index)
+        if len(joined) == USERS:
+            ready.set()
+
+        received = 0
+        while received < MESSAGES:
+            data = json.loads(await ws.recv())
+            if data.get("type") != "message" or not (data["data"]["content"] or "").startswith("bench:"):
+                continue
+            seq = int(data["data"]["content"].split(":")[1])
+            # 보내는 쪽은 항상 0번 인스턴스에 접속
+            latencies["same" if instance == 0 else "cross"].append((time.perf_counter() - sent[seq]) * 1000)
+            received += 1
+
+async def sender(token: str, room_id: str, sent: dict, ready: asyncio.Event):
+    await ready.wait()
+    async with websockets.connect(f"ws://127.0.0.1:{BASE_PORT}/ws/chat") as ws:
+        await ws.send(json.dumps({"type": "auth", "token": token}))
+        await ws.recv()
+        await ws.send(json.dumps({"type": "join_room", "room_id": room_id}))
+        for seq in range(MESSAGES):
+            sent[seq] = time.perf_counter()
+            await ws.send(json.dumps({"type": "message", "content": f"bench:{seq}"}))
+            await asyncio.sleep(SEND_INTERVAL)
+        await asyncio.sleep(1)
+
+def summary(values: list) -> str:
+    if not values:
+        return "수신 없음"
+    values = sorted(values)
+    return (f"수신: {len(values)} | p50: {statistics.median(values):.1f}ms | "
+            f"p99: {values[int(len(values) * 0.99) - 1]:.1f}ms | 최대: {values[-1]:.1f}ms")
+
+async def main():
+    processes = start_instances()
+    try:
+        async with httpx.AsyncClient(timeout=30) as http:
+            for i in range(INSTANCES):
+                await wait_ready(http, BASE_PORT + i)
+
+            admin = {"Authorization": f"Bearer {await login(http, 'admin', 'admin')}"}
+            users = await prepare_users(http, admin)
+            room = (await http.post(f"http://127.0.0.1:{BASE_PORT}/api/chat/rooms", headers=admin, json={
+                "name": "[벤치마크] 브로드캐스트", "type": "group", "member_ids": [uid for _, uid in users]
+            })).json()
+            tokens = [await login(http, username, PASSWORD) for username, _ in users]
+
+            print("=" * 50)
+            print(f"브로드캐스트 부하 테스트 | 인스턴스: {INSTANCES} | 사용자: {USERS} | 메시지: {MESSAGES}")
+            print("=" * 50)
+
+            sent, latencies, joined = {}, {"same": [], "cross": []}, []
+            ready = asyncio.Event()
+            started = time.perf_counter()
+            try:
+                await asyncio.wait_for(asyncio.gather(
+                    sender(admin["Authorization"][7:], room["id"], sent, ready),
+                    *(client(i, token, room["id"], sent, latencies, ready, joined) for i, token in enumerate(tokens))
+                ), timeout=MESSAGES * SEND_INTERVAL + 60)
+            except asyncio.TimeoutError:
+                print("⚠ 시간 초과 - 받은 메시지까지만 집계")
+            elapsed = time.perf_counter() - started
+
+            print(f"소요 시간: {elapsed:.2f}초")
+            print(f"같은 인스턴스 | {summary(latencies['same'])}")
+            print(f"다른 인스턴스 | {summary(latencies['cross'])}")
+            expected = USERS * MESSAGES
+            received = len(latencies["same"]) + len(latencies["cross"])
+            print("✅ 통과" if received == expected else f"❌ 실패 (수신 {received}/{expected})")
+
+            for _, uid in users:
+                await http.delete(f"http://127.0.0.1:{BASE_PORT}/api/users/{uid}", headers=admin)
+    finally:
+        for process in processes:
+            process.terminate()
+        for process in processes:
+            process.wait()
+
+if __name__ == "__main__":
+    asyncio.run(main())
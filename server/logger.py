@@ -1,23 +1,191 @@
+import atexit
+import json
 import logging
+import queue
 import sys
 import os
+import time
+from collections import OrderedDict
 from datetime import datetime, timezone, timedelta
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 from pathlib import Path
 
 SEOUL_TZ = timezone(timedelta(hours=9))
 LOG_DIR = Path(__file__).parent / "logs"
 LOG_DIR.mkdir(exist_ok=True)
 
+# 이벤트 루프에서는 큐에 넣기만 하고, 파일/콘솔 출력과 로테이션은 리스너 스레드에서 처리
+LOG_ASYNC = os.getenv("LOG_ASYNC", "true").lower() == "true"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+# 큐가 이 비율 이상 차면 DEBUG 레코드는 버림 (큐가 가득 차면 레벨과 무관하게 버림)
+LOG_QUEUE_HIGH_WATER = 0.8
+# 유저별 로그 파일은 최근 사용한 것만 열어 둠 (초과하거나 오래 쓰이지 않으면 닫음)
+LOG_USER_MAX_OPEN = int(os.getenv("LOG_USER_MAX_OPEN", "64"))
+LOG_USER_IDLE_TIMEOUT = float(os.getenv("LOG_USER_IDLE_TIMEOUT", "300"))
+
 class SeoulFormatter(logging.Formatter):
     def formatTime(self, record, datefmt=None):
         ct = datetime.fromtimestamp(record.created, tz=SEOUL_TZ)
         return ct.strftime(datefmt or "%Y-%m-%d %H:%M:%S")
 
+class JsonFormatter(SeoulFormatter):
+    """record.fields를 한 줄 JSON으로 (직렬화는 리스너 스레드에서 수행)"""
+
+    def format(self, record):
+        fields = getattr(record, "fields", None) or {"message": record.getMessage()}
+        return json.dumps({"time": self.formatTime(record), **fields}, ensure_ascii=False, default=str)
+
+class DispatchHandler(logging.Handler):
+    """리스너 스레드에서 로거 이름별로 실제 핸들러에 전달"""
+
+    def __init__(self):
+        super().__init__()
+        self.routes = {}
+
+    def handle(self, record):
+        for handler in self.routes.get(record.name, ()):
+            if record.levelno >= handler.level:
+                handler.handle(record)
+        return True
+
+    def emit(self, record):
+        pass
+
+class BoundedQueueHandler(QueueHandler):
+    """한도가 있는 큐에 넣기만 하는 핸들러 (블로킹 없음)"""
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.high_water = int(log_queue.maxsize * LOG_QUEUE_HIGH_WATER)
+        self.dropped_debug = 0
+        self.dropped = 0
+
+    def emit(self, record):
+        if record.levelno <= logging.DEBUG and self.queue.qsize() >= self.high_water:
+            self.dropped_debug += 1
+            return
+        try:
+            self.queue.put_nowait(self.prepare(record))
+        except queue.Full:
+            self.dropped += 1
+        except Exception:
+            self.handleError(record)
+
+class UserFileHandler(logging.Handler):
+    """record.username별 파일에 기록, 열린 파일은 LRU로 개수 제한"""
+
+    def __init__(self, directory: Path, max_open: int = LOG_USER_MAX_OPEN, idle_timeout: float = LOG_USER_IDLE_TIMEOUT):
+        super().__init__()
+        self.directory = directory
+        self.max_open = max_open
+        self.idle_timeout = idle_timeout
+        self.files = OrderedDict()
+        self.opened = 0
+        self.closed = 0
+        self._next_sweep = time.monotonic() + idle_timeout
+
+    def _open(self, username: str, now: float) -> RotatingFileHandler:
+        entry = self.files.get(username)
+        if entry is not None:
+            self.files[username] = (entry[0], now)
+            self.files.move_to_end(username)
+            return entry[0]
+
+        self.directory.mkdir(exist_ok=True)
+        # 유저별 로그 파일 (5MB, 3개 백업)
+        handler = RotatingFileHandler(
+            self.directory / f"{username}.log",
+            maxBytes=5*1024*1024,
+            backupCount=3,
+            encoding="utf-8"
+        )
+        handler.setFormatter(self.formatter)
+        self.files[username] = (handler, now)
+        self.opened += 1
+        while len(self.files) > self.max_open:
+            self._close(next(iter(self.files)))
+        return handler
+
+    def _close(self, username: str):
+        handler, _ = self.files.pop(username)
+        handler.close()
+        self.closed += 1
+
+    def _sweep(self, now: float):
+        self._next_sweep = now + self.idle_timeout
+        for username, (_, last_used) in list(self.files.items()):
+            if now - last_used < self.idle_timeout:
+                break
+            self._close(username)
+
+    def emit(self, record):
+        username = getattr(record, "username", None)
+        if not username:
+            return
+        try:
+            now = time.monotonic()
+            self._open(username, now).emit(record)
+            if now >= self._next_sweep:
+                self._sweep(now)
+        except Exception:
+            self.handleError(record)
+
+    def open_count(self) -> int:
+        return len(self.files)
+
+    def close(self):
+        self.acquire()
+        try:
+            for username in list(self.files):
+                self._close(username)
+        finally:
+            self.release()
+        super().close()
+
+_log_queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+_dispatch = DispatchHandler()
+_queue_handler = BoundedQueueHandler(_log_queue)
+_listener = QueueListener(_log_queue, _dispatch)
+_listener_running = False
+
+def _attach(target: logging.Logger, *handlers):
+    if LOG_ASYNC:
+        _dispatch.routes[target.name] = handlers
+        target.addHandler(_queue_handler)
+    else:
+        for handler in handlers:
+            target.addHandler(handler)
+
+def start_logging():
+    global _listener_running
+    if LOG_ASYNC and not _listener_running:
+        _listener.start()
+        _listener_running = True
+
+def stop_logging():
+    """큐에 남은 로그를 모두 기록한 뒤 리스너 종료"""
+    global _listener_running
+    if _listener_running:
+        _listener.stop()
+        _listener_running = False
+
+def log_stats() -> dict:
+    return {
+        "async": LOG_ASYNC,
+        "queue_size": LOG_QUEUE_SIZE,
+        "queued": _log_queue.qsize(),
+        "dropped_debug": _queue_handler.dropped_debug,
+        "dropped": _queue_handler.dropped,
+        "user_files_open": _user_files.open_count(),
+        "user_files_opened": _user_files.opened,
+        "user_files_closed": _user_files.closed
+    }
+
 def setup_logger():
     # 시스템 로거
     system_logger = logging.getLogger("system")
-    system_logger.setLevel(logging.INFO)
+    system_logger.setLevel(LOG_LEVEL)
     system_logger.propagate = False
 
     formatter = SeoulFormatter("[%(levelname)s] %(asctime)s | %(message)s")
@@ -25,7 +193,6 @@ def setup_logger():
     # 콘솔 핸들러
     console = logging.StreamHandler(sys.stdout)
     console.setFormatter(SeoulFormatter("%(asctime)s | %(message)s"))
-    system_logger.addHandler(console)
 
     # 시스템 로그 파일 (10MB, 5개 백업)
     system_file = RotatingFileHandler(
@@ -35,7 +202,6 @@ def setup_logger():
         encoding="utf-8"
     )
     system_file.setFormatter(formatter)
-    system_logger.addHandler(system_file)
 
     # 에러 로그 파일
     error_file = RotatingFileHandler(
@@ -46,12 +212,12 @@ def setup_logger():
     )
     error_file.setLevel(logging.ERROR)
     error_file.setFormatter(formatter)
-    system_logger.addHandler(error_file)
 
+    _attach(system_logger, console, system_file, error_file)
     return system_logger
 
 def get_access_logger():
-    """API 요청/응답 전용 로거"""
+    """API 요청 전용 로거 (요청당 JSON 한 줄, extra={"fields": {...}})"""
     access_logger = logging.getLogger("access")
     if access_logger.handlers:
         return access_logger
@@ -66,8 +232,8 @@ def get_access_logger():
         backupCount=5,
         encoding="utf-8"
     )
-    access_file.setFormatter(SeoulFormatter("%(asctime)s | %(message)s"))
-    access_logger.addHandler(access_file)
+    access_file.setFormatter(JsonFormatter())
+    _attach(access_logger, access_file)
 
     return access_logger
 
@@ -83,7 +249,6 @@ def get_event_logger():
     # 콘솔 출력
     console = logging.StreamHandler(sys.stdout)
     console.setFormatter(SeoulFormatter("%(asctime)s | %(message)s"))
-    event_logger.addHandler(console)
 
     # event.log 파일
     event_file = RotatingFileHandler(
@@ -93,38 +258,33 @@ def get_event_logger():
         encoding="utf-8"
     )
     event_file.setFormatter(SeoulFormatter("%(asctime)s | %(message)s"))
-    event_logger.addHandler(event_file)
+    _attach(event_logger, console, event_file)
 
     return event_logger
 
-def get_user_logger(username: str):
-    """유저별 로거 반환"""
-    logger_name = f"user.{username}"
-    user_logger = logging.getLogger(logger_name)
-
-    if user_logger.handlers:
-        return user_logger
-
+def setup_user_logger():
+    """유저별 감사 로그용 공통 로거 (파일은 UserFileHandler가 username별로 분리)"""
+    user_logger = logging.getLogger("user")
     user_logger.setLevel(logging.INFO)
     user_logger.propagate = False
 
-    user_dir = LOG_DIR / "users"
-    user_dir.mkdir(exist_ok=True)
-
-    # 유저별 로그 파일 (5MB, 3개 백업)
-    handler = RotatingFileHandler(
-        user_dir / f"{username}.log",
-        maxBytes=5*1024*1024,
-        backupCount=3,
-        encoding="utf-8"
-    )
-    handler.setFormatter(SeoulFormatter("%(asctime)s | %(message)s"))
-    user_logger.addHandler(handler)
+    if user_logger.handlers:
+        return user_logger
 
+    _user_files.setFormatter(SeoulFormatter("%(asctime)s | %(message)s"))
+    _attach(user_logger, _user_files)
     return user_logger
 
+def get_user_logger(username: str) -> logging.LoggerAdapter:
+    """유저별 로거 반환 (username을 레코드에 실어 보내는 어댑터, 유저 수만큼 로거를 만들지 않음)"""
+    return logging.LoggerAdapter(_user_logger, {"username": username})
+
 # 시스템 로거 초기화
+_user_files = UserFileHandler(LOG_DIR / "users")
 logger = setup_logger()
+_user_logger = setup_user_logger()
+start_logging()
+atexit.register(stop_logging)
 
 # uvicorn 로거 커스터마이징
 uvicorn_logger = logging.getLogger("uvicorn")
@@ -0,0 +1,192 @@
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+import traceback
+import weakref
+from collections import deque
+from logger import logger
+from metrics import Counter, Gauge, HistogramMetric
+
+# 이벤트 루프 지연 감시: 루프에서 도는 probe가 주기적으로 시각을 갱신하고,
+# 별도 스레드(watchdog)가 갱신이 멈춘 것을 보면 루프 스레드의 스택을 캡처
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "true").lower() == "true"
+LOOP_PROBE_INTERVAL = float(os.getenv("LOOP_PROBE_INTERVAL", "0.1"))
+LOOP_STALL_THRESHOLD_MS = float(os.getenv("LOOP_STALL_THRESHOLD_MS", "250"))
+# 정지 라벨은 watchdog이 루프에서 실행 중인 태스크의 activity로 판단 (콜백 교체 없음)
+# Python 3.12+는 task.get_context(), 3.11은 태스크 생성 시 부모 activity를 기록하는 task factory 사용
+TASK_CONTEXT = hasattr(asyncio.Task, "get_context")
+RECENT_STALLS = 20
+STACK_LIMIT = 30
+
+# 현재 처리 중인 요청/메시지 (예: "GET /api/posts", "ws:message")
+activity = contextvars.ContextVar("activity", default=None)
+
+_lag_seconds = HistogramMetric(
+    "dongin_loop_lag_seconds", "이벤트 루프 지연 (probe 예정 시각 대비)",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+)
+_stall_seconds = HistogramMetric(
+    "dongin_loop_stall_seconds", "임계값을 넘은 루프 정지 시간",
+    buckets=(0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+)
+_stalls_total = Counter("dongin_loop_stalls_total", "임계값을 넘은 루프 정지 횟수", ("kind",))
+Gauge("dongin_loop_monitor_enabled", "루프 감시 활성 여부", lambda: int(_enabled))
+
+_enabled = False
+_loop = None
+_loop_thread_id = None
+_probe_task = None
+_watchdog = None
+_beat = 0.0
+_captured = None
+_task_labels = weakref.WeakKeyDictionary()
+_previous_factory = None
+_recent = deque(maxlen=RECENT_STALLS)
+_stats = {"stalls": 0, "stall_ms_max": 0.0, "lag_ms_last": 0.0, "lag_ms_max": 0.0}
+
+def set_activity(label: str):
+    activity.set(label)
+    if not TASK_CONTEXT:
+        task = asyncio.current_task()
+        if task is not None:
+            _task_labels[task] = label
+
+def _task_factory(loop, coro, **kwargs):
+    # 자식 태스크(예: BaseHTTPMiddleware의 call_next)도 부모의 activity로 표시되도록 기록
+    if _previous_factory is not None:
+        task = _previous_factory(loop, coro, **kwargs)
+    else:
+        task = asyncio.Task(coro, loop=loop, **kwargs)
+    context = kwargs.get("context")
+    label = context.get(activity) if context is not None else activity.get()
+    if label is not None:
+        _task_labels[task] = label
+    return task
+
+def _running_label():
+    """watchdog 스레드에서 루프가 실행 중인 태스크의 activity 조회"""
+    task = getattr(asyncio.tasks, "_current_tasks", {}).get(_loop)
+    if task is None:
+        return None
+    if TASK_CONTEXT:
+        return task.get_context().get(activity)
+    return _task_labels.get(task)
+
+def _capture_stack() -> str:
+    frame = sys._current_frames().get(_loop_thread_id)
+    if frame is None:
+        return ""
+    return "".join(traceback.format_stack(frame, limit=STACK_LIMIT))
+
+def _watch(stop: threading.Event):
+    """루프가 임계값 이상 멈춰 있으면 (정지 1회당 한 번) 스택 캡처"""
+    global _captured
+    reported_beat = None
+    while not stop.wait(min(LOOP_PROBE_INTERVAL, LOOP_STALL_THRESHOLD_MS / 2000)):
+        threshold = LOOP_STALL_THRESHOLD_MS / 1000
+        beat = _beat
+        # probe는 beat 기록 후 LOOP_PROBE_INTERVAL 동안 정상적으로 잠들어 있으므로 그 이후부터 지연으로 판단
+        if time.monotonic() - (beat + LOOP_PROBE_INTERVAL) < threshold or beat == reported_beat:
+            continue
+        reported_beat = beat
+        label = _running_label() or "-"
+        stack = _capture_stack()
+        _captured = (beat, label, stack)
+        logger.warning(f"[루프 정지] {LOOP_STALL_THRESHOLD_MS:.0f}ms 초과 진행 중 | 작업: {label}\n{stack}")
+
+def _kind(label: str) -> str:
+    # 지표 라벨은 경로 파라미터로 늘어나지 않도록 종류만 (상세 경로는 로그/최근 목록에)
+    if label.startswith("ws:"):
+        return label
+    return "http" if label != "-" else "other"
+
+def _record_stall(lag: float):
+    global _captured
+    label, stack = "-", ""
+    if _captured is not None:
+        _, label, stack = _captured
+        _captured = None
+    lag_ms = lag * 1000
+    _stats["stalls"] += 1
+    _stats["stall_ms_max"] = max(_stats["stall_ms_max"], lag_ms)
+    _stall_seconds.observe(lag)
+    _stalls_total.inc(labels=(_kind(label),))
+    _recent.append({
+        "at": time.time(),
+        "duration_ms": round(lag_ms, 1),
+        "activity": label,
+        "stack": stack
+    })
+    logger.warning(f"[루프 정지] 시간: {lag_ms:.0f}ms | 작업: {label}")
+
+async def _probe():
+    global _beat, _captured
+    while True:
+        _beat = time.monotonic()
+        expected = _loop.time() + LOOP_PROBE_INTERVAL
+        await asyncio.sleep(LOOP_PROBE_INTERVAL)
+        lag = max(_loop.time() - expected, 0)
+        _lag_seconds.observe(lag)
+        _stats["lag_ms_last"] = round(lag * 1000, 3)
+        _stats["lag_ms_max"] = max(_stats["lag_ms_max"], _stats["lag_ms_last"])
+        if lag * 1000 >= LOOP_STALL_THRESHOLD_MS:
+            _record_stall(lag)
+        else:
+            # 임계값 직전에 회복된 경우의 캡처가 다음 정지에 잘못 붙지 않도록
+            _captured = None
+
+def enable():
+    """현재 루프에서 감시 시작 (실행 중 토글 가능)"""
+    global _enabled, _loop, _loop_thread_id, _probe_task, _watchdog, _beat, _previous_factory
+    if _enabled:
+        return
+    _loop = asyncio.get_running_loop()
+    _loop_thread_id = threading.get_ident()
+    _beat = time.monotonic()
+    if not TASK_CONTEXT:
+        _previous_factory = _loop.get_task_factory()
+        _loop.set_task_factory(_task_factory)
+    _probe_task = _loop.create_task(_probe())
+    stop = threading.Event()
+    thread = threading.Thread(target=_watch, args=(stop,), name="loop-watchdog", daemon=True)
+    thread.start()
+    _watchdog = (thread, stop)
+    _enabled = True
+    logger.info(f"[루프 감시] 시작 | 임계값: {LOOP_STALL_THRESHOLD_MS:.0f}ms")
+
+def disable():
+    global _enabled, _probe_task, _watchdog, _previous_factory
+    if not _enabled:
+        return
+    if not TASK_CONTEXT:
+        _loop.set_task_factory(_previous_factory)
+        _previous_factory = None
+    _probe_task.cancel()
+    _probe_task = None
+    thread, stop = _watchdog
+    stop.set()
+    _watchdog = None
+    _enabled = False
+    logger.info("[루프 감시] 중지")
+
+def set_threshold(threshold_ms: float):
+    global LOOP_STALL_THRESHOLD_MS
+    LOOP_STALL_THRESHOLD_MS = threshold_ms
+
+async def start():
+    if LOOP_MONITOR_ENABLED:
+        enable()
+
+async def stop():
+    disable()
+
+def stats() -> dict:
+    return {
+        "enabled": _enabled,
+        "threshold_ms": LOOP_STALL_THRESHOLD_MS,
+        **_stats,
+        "recent": list(_recent)
+    }
@@ -1,55 +1,76 @@
 from contextlib import asynccontextmanager
 from fastapi import FastAPI, Depends, HTTPException, status, Request, WebSocket, UploadFile, File, Form
-from fastapi.responses import FileResponse, StreamingResponse, HTMLResponse
+from fastapi.responses import FileResponse, StreamingResponse, HTMLResponse, PlainTextResponse
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import OAuth2PasswordRequestForm
+from starlette.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy import func
 from typing import List, Optional
 import uvicorn
 import os
 import time
-import datetime
 import asyncio
 import random
 import aiosmtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email_validator import validate_email, EmailNotValidError
-from logger import logger, get_user_logger, get_access_logger, get_event_logger
+from logger import logger, get_user_logger, get_access_logger, get_event_logger, log_stats, stop_logging
 import uuid
 
-from database import engine, get_db, Base
-from models import User, Post, Comment, Inventory, ChatRoom, ChatRoomMember, ChatMessage, ChatFile, ChatReadReceipt
+from database import engine, get_db, run_db, db_session, pool_status, Base
+from models import User, Post, Comment, Inventory, ChatRoom, ChatRoomMember, ChatMessage, ChatFile
 from schemas import (
     UserCreate, UserUpdate, UserResponse,
     Token, PasswordChange, EventLog,
     PostCreate, PostResponse, CommentCreate, CommentResponse,
-    AiChatRequest,
+    AiChatRequest, AiConversationCreate, AiConversationResponse,
     CheckEmailRequest, SendOtpRequest, VerifyOtpRequest, SignupRequest,
     InventoryCreate, InventoryUpdate, InventoryResponse,
     ChatRoomCreate, ChatRoomResponse, MessageResponse, ChatReadRequest, FileUploadResponse,
+    LoopMonitorUpdate,
 )
 import ai_engine
+import ai_cache
+import ai_stream
+import ai_conversations
+from ai_scheduler import scheduler as ai_scheduler
 from auth import (
-    get_password_hash, verify_password, create_access_token,
-    get_current_user, get_current_active_admin
+    get_password_hash, hash_password, verify_and_update, create_access_token,
+    get_current_user, get_current_active_admin,
+    CurrentUser, invalidate_user, user_cache_stats, password_hash_stats
 )
 import chat_websocket
 import chat_manager
+import presence
+import metrics
+import loop_monitor
 from chat_file_handler import save_chat_file, create_thumbnail, validate_mime_type
+from chat_rooms import get_room_list, rebuild_summaries
+import chat_history
+from chat_connection import encode_message
 
 ALLOWED_HOSTS = os.getenv("ALLOWED_HOSTS", "localhost,127.0.0.1").split(",")
 
-ai_queue = asyncio.Queue()
-ai_processing = False
-ai_lock = asyncio.Lock()
+# 접근 로그 샘플링: 라우트 템플릿별 비율 (기본 ACCESS_LOG_SAMPLE_RATE), 오류/느린 요청은 항상 기록
+ACCESS_LOG_SAMPLE_RATE = float(os.getenv("ACCESS_LOG_SAMPLE_RATE", "1"))
+ACCESS_LOG_SAMPLE_ROUTES = {
+    route.strip(): float(rate)
+    for route, _, rate in (
+        item.partition("=") for item in os.getenv(
+            "ACCESS_LOG_SAMPLE_ROUTES", "/api/heartbeat=0,/health=0,/api/ai/chat=0,/metrics=0"
+        ).split(",") if item.strip()
+    )
+}
+ACCESS_LOG_SLOW_MS = float(os.getenv("ACCESS_LOG_SLOW_MS", "1000"))
+# /metrics 스크레이프 토큰 (설정 시 Authorization: Bearer <토큰> 필요)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
 
 otp_store = {}
 verified_emails = {}
-_last_online_count = None
 
 def init_test_accounts(db: Session):
     if not db.query(User).filter(User.username == "admin").first():
@@ -123,6 +144,22 @@ async def lifespan(app: FastAPI):
                 conn.execute(text("ALTER TABLE inventory ADD COLUMN low_stock_threshold INTEGER DEFAULT 10 NOT NULL"))
             logger.info("데이터베이스 스키마 업데이트 완료 (low_stock_threshold 컬럼 추가)")
 
+    if "chat_room_members" in insp.get_table_names():
+        member_cols = [c["name"] for c in insp.get_columns("chat_room_members")]
+        if "read_offset" not in member_cols:
+            with engine.begin() as conn:
+                conn.execute(text("ALTER TABLE chat_room_members ADD COLUMN read_offset BIGINT DEFAULT 0 NOT NULL"))
+            db = next(get_db())
+            try:
+                room_count = rebuild_summaries(db)
+            finally:
+                db.close()
+            logger.info(f"데이터베이스 스키마 업데이트 완료 (read_offset 컬럼 추가, 채팅방 요약 {room_count}개 생성)")
+
+    # 기존 DB에는 create_all이 인덱스를 추가하지 않으므로 직접 생성 (키셋 페이지네이션용)
+    with engine.begin() as conn:
+        conn.execute(text("CREATE INDEX IF NOT EXISTS idx_room_id ON chat_messages (room_id, id)"))
+
     db = next(get_db())
     try:
         init_test_accounts(db)
@@ -143,11 +180,22 @@ async def lifespan(app: FastAPI):
     finally:
         db.close()
 
+    await chat_manager.start_broadcast()
+    await presence.start()
+    await ai_engine.start(ai_scheduler.set_slots)
+    await loop_monitor.start()
+
     yield
 
+    await loop_monitor.stop()
+    await ai_engine.stop()
+    await presence.stop()
+    await chat_manager.stop_broadcast()
+
     logger.info("="*50)
     logger.info("Dongin Portal 서버 종료")
     logger.info("="*50)
+    stop_logging()
 
 app = FastAPI(
     title="Dongin Portal API",
@@ -167,31 +215,44 @@ app.add_middleware(
 
 app.add_middleware(TrustedHostMiddleware, allowed_hosts=["*"])
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    # heartbeat, health 체크는 로깅 제외
-    skip_paths = {"/api/heartbeat", "/health", "/api/ai/chat"}
-    should_log = request.url.path not in skip_paths
-
-    start_time = time.time()
-    access_logger = get_access_logger()
+access_logger = get_access_logger()
 
-    if should_log:
-        client_host = request.client.host if request.client else "unknown"
-        access_logger.info(f"[요청] {request.method} {request.url.path} | 클라이언트: {client_host}")
+def _should_log_access(route: str, status_code: int, duration_ms: float) -> bool:
+    if status_code >= 400 or duration_ms >= ACCESS_LOG_SLOW_MS:
+        return True
+    rate = ACCESS_LOG_SAMPLE_ROUTES.get(route, ACCESS_LOG_SAMPLE_RATE)
+    return rate >= 1 or (rate > 0 and random.random() < rate)
 
+@app.middleware("http")
+async def log_requests(request: Request, call_next):
+    loop_monitor.set_activity(f"{request.method} {request.url.path}")
+    start_time = time.perf_counter()
+    status_code = 500
     try:
         response = await call_next(request)
-        process_time = (time.time() - start_time) * 1000
-
-        if should_log:
-            access_logger.info(f"[응답] {request.method} {request.url.path} | 상태: {response.status_code} | 처리시간: {process_time:.2f}ms")
-
+        status_code = response.status_code
         return response
     except Exception as e:
-        process_time = (time.time() - start_time) * 1000
+        process_time = (time.perf_counter() - start_time) * 1000
         logger.error(f"[오류] {request.method} {request.url.path} | 처리시간: {process_time:.2f}ms | 오류: {str(e)}", exc_info=True)
         raise
+    finally:
+        process_time = (time.perf_counter() - start_time) * 1000
+        # 라우트 템플릿 단위로 집계 (경로 파라미터마다 항목이 늘지 않도록)
+        matched = request.scope.get("route")
+        route = matched.path if matched is not None else "unmatched"
+        metrics.observe_request(request.method, route, status_code, process_time)
+
+        if _should_log_access(route, status_code, process_time):
+            access_logger.info("request", extra={"fields": {
+                "method": request.method,
+                "route": route,
+                "path": request.url.path,
+                "status": status_code,
+                "duration_ms": round(process_time, 2),
+                "user": getattr(request.state, "username", None),
+                "client": request.client.host if request.client else None
+            }})
 
 UPDATES_DIR = os.path.join(os.path.dirname(__file__), "updates")
 os.makedirs(UPDATES_DIR, exist_ok=True)
@@ -415,6 +476,19 @@ async def root():
 async def health(db: Session = Depends(get_db)):
     return {"status": "ok"}
 
+@app.get("/health/pool")
+async def health_pool():
+    pool = pool_status()
+    saturated = pool["checked_out"] >= pool["size"] + pool["max_overflow"]
+    return {"status": "saturated" if saturated else "ok", "pool": pool}
+
+@app.get("/metrics")
+async def prometheus_metrics(request: Request):
+    """Prometheus 텍스트 형식 지표"""
+    if METRICS_TOKEN and request.headers.get("authorization") != f"Bearer {METRICS_TOKEN}":
+        raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="인증 실패")
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 async def send_otp_email(email: str, otp: str):
     dev_mode = os.getenv("DEV_MODE", "true").lower() == "true"
 
@@ -524,7 +598,7 @@ DONGIN PORTAL 회원가입이 승인되었습니다.
         )
 
 @app.post("/api/auth/check-email")
-async def check_email(request: CheckEmailRequest, db: Session = Depends(get_db)):
+def check_email(request: CheckEmailRequest, db: Session = Depends(get_db)):
     try:
         validate_email(request.email, check_deliverability=True)
     except EmailNotValidError as e:
@@ -584,11 +658,11 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
         raise HTTPException(status_code=400, detail="이메일 인증이 필요합니다")
 
     try:
-        validate_email(request.email, check_deliverability=True)
+        await run_in_threadpool(validate_email, request.email, check_deliverability=True)
     except EmailNotValidError as e:
         raise HTTPException(status_code=400, detail=f"유효하지 않은 이메일: {str(e)}")
 
-    if db.query(User).filter(User.email == request.email).first():
+    if await run_db(db.query(User).filter(User.email == request.email).first):
         raise HTTPException(status_code=400, detail="이미 가입된 이메일입니다")
 
     if len(request.password) < 8:
@@ -599,7 +673,7 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
     user = User(
         username=username,
         email=request.email,
-        hashed_password=get_password_hash(request.password),
+        hashed_password=await hash_password(request.password),
         name=request.name,
         position="일반",
         role="user",
@@ -607,11 +681,9 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
         approval_status="pending"
     )
 
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    await run_db(_save_and_commit, db, user)
 
-    del verified_emails[request.email]
+    verified_emails.pop(request.email, None)
 
     logger.info(f"[회원가입 요청] 이메일: {request.email} | 사용자명: {username} | 상태: 승인 대기")
     return {"success": True, "message": "회원가입 요청이 완료되었습니다. 관리자 승인 후 이용 가능합니다."}
@@ -619,8 +691,9 @@ async def signup(request: SignupRequest, db: Session = Depends(get_db)):
 
 @app.post("/api/auth/login", response_model=Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.hashed_password):
+    user = await run_db(db.query(User).filter(User.username == form_data.username).first)
+    verified, new_hash = await verify_and_update(form_data.password, user.hashed_password) if user else (False, None)
+    if not verified:
         logger.warning(f"[로그인 실패] 사용자명: {form_data.username} | 이유: 잘못된 인증 정보")
         raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="아이디 또는 비밀번호 오류")
     if not user.is_active:
@@ -629,36 +702,43 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: Session =
             raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="관리자 승인 대기 중입니다")
         logger.warning(f"[로그인 실패] 사용자명: {user.username} | 이유: 비활성화된 계정")
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="비활성화된 계정")
-    access_token = create_access_token(data={"sub": user.username, "role": user.role})
-    logger.info(f"[로그인 성공] 사용자: {user.username} | 역할: {user.role}")
-    get_user_logger(user.username).info(f"[로그인 성공] 역할: {user.role}")
+    username, role = user.username, user.role
+    if new_hash:
+        user.hashed_password = new_hash
+        await run_db(db.commit)
+        logger.info(f"[비밀번호 해시 갱신] 사용자: {username}")
+    access_token = create_access_token(data={"sub": username, "role": role})
+    logger.info(f"[로그인 성공] 사용자: {username} | 역할: {role}")
+    get_user_logger(username).info(f"[로그인 성공] 역할: {role}")
     return {"access_token": access_token, "token_type": "bearer"}
 
 @app.get("/api/users/me", response_model=UserResponse)
-async def get_me(current_user: User = Depends(get_current_user)):
-    return current_user
+def get_me(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    return db.query(User).filter(User.id == current_user.id).first()
 
 @app.put("/api/users/me/password")
 async def change_my_password(
     password_data: PasswordChange,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    if not verify_password(password_data.current_password, current_user.hashed_password):
+    user = await run_db(db.query(User).filter(User.id == current_user.id).first)
+    verified, _ = await verify_and_update(password_data.current_password, user.hashed_password)
+    if not verified:
         logger.warning(f"[비밀번호 변경 실패] 사용자: {current_user.username} | 이유: 현재 비밀번호 불일치")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="현재 비밀번호 오류")
-    current_user.hashed_password = get_password_hash(password_data.new_password)
-    db.commit()
+    user.hashed_password = await hash_password(password_data.new_password)
+    await run_db(db.commit)
     logger.info(f"[비밀번호 변경 완료] 사용자: {current_user.username}")
     user_logger = get_user_logger(current_user.username)
     user_logger.info("[비밀번호 변경 완료]")
     return {"message": "비밀번호 변경 완료"}
 
 @app.get("/api/users", response_model=List[UserResponse])
-async def get_users(
+def get_users(
     skip: int = 0,
     limit: int = 100,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
     db: Session = Depends(get_db)
 ):
     users = db.query(User).offset(skip).limit(limit).all()
@@ -666,9 +746,9 @@ async def get_users(
     return users
 
 @app.get("/api/users/search")
-async def search_users(
+def search_users(
     q: str,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     if not q or len(q.strip()) == 0:
@@ -684,9 +764,9 @@ async def search_users(
     return [{"id": u.id, "name": u.name, "email": u.email or ""} for u in users]
 
 @app.get("/api/users/{user_id}", response_model=UserResponse)
-async def get_user(
+def get_user(
     user_id: int,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
     db: Session = Depends(get_db)
 ):
     user = db.query(User).filter(User.id == user_id).first()
@@ -699,32 +779,30 @@ async def get_user(
 @app.post("/api/users", response_model=UserResponse, status_code=status.HTTP_201_CREATED)
 async def create_user(
     user_data: UserCreate,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
     db: Session = Depends(get_db)
 ):
-    if db.query(User).filter(User.username == user_data.username).first():
+    if await run_db(db.query(User).filter(User.username == user_data.username).first):
         logger.warning(f"[사용자 생성 실패] 관리자: {current_user.username} | 이유: 중복된 사용자명 ({user_data.username})")
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail="이미 존재하는 사용자명")
     user = User(
         username=user_data.username,
-        hashed_password=get_password_hash(user_data.password),
+        hashed_password=await hash_password(user_data.password),
         name=user_data.name,
         position=user_data.position,
         role=user_data.role
     )
-    db.add(user)
-    db.commit()
-    db.refresh(user)
+    await run_db(_save_and_refresh, db, user)
     logger.info(f"[사용자 생성 완료] 관리자: {current_user.username} | 신규 사용자: {user.username} | 역할: {user.role}")
     admin_logger = get_user_logger(current_user.username)
     admin_logger.info(f"[사용자 생성] 신규 사용자: {user.username} | 역할: {user.role}")
     return user
 
 @app.put("/api/users/{user_id}", response_model=UserResponse)
-async def update_user(
+def update_user(
     user_id: int,
     user_data: UserUpdate,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
     db: Session = Depends(get_db)
 ):
     user = db.query(User).filter(User.id == user_id).first()
@@ -737,6 +815,9 @@ async def update_user(
         setattr(user, key, value)
     db.commit()
     db.refresh(user)
+    invalidate_user(user.username)
+    if not user.is_active:
+        presence.forget(user.id)
     logger.info(f"[사용자 정보 수정 완료] 관리자: {current_user.username} | 대상: {user.username} | 수정 항목: {', '.join(updated_fields)}")
     admin_logger = get_user_logger(current_user.username)
     admin_logger.info(f"[사용자 정보 수정] 대상: {user.username} | 수정 항목: {', '.join(updated_fields)}")
@@ -746,24 +827,25 @@ async def update_user(
 async def reset_user_password(
     user_id: int,
     new_password: str,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
     db: Session = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await run_db(db.query(User).filter(User.id == user_id).first)
     if not user:
         logger.warning(f"[비밀번호 초기화 실패] 관리자: {current_user.username} | 이유: 사용자 없음 (ID: {user_id})")
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="사용자 없음")
-    user.hashed_password = get_password_hash(new_password)
-    db.commit()
-    logger.info(f"[비밀번호 초기화 완료] 관리자: {current_user.username} | 대상 사용자: {user.username}")
+    username = user.username
+    user.hashed_password = await hash_password(new_password)
+    await run_db(db.commit)
+    logger.info(f"[비밀번호 초기화 완료] 관리자: {current_user.username} | 대상 사용자: {username}")
     admin_logger = get_user_logger(current_user.username)
-    admin_logger.info(f"[비밀번호 초기화] 대상 사용자: {user.username}")
+    admin_logger.info(f"[비밀번호 초기화] 대상 사용자: {username}")
     return {"message": "비밀번호 초기화 완료"}
 
 @app.delete("/api/users/{user_id}")
-async def delete_user(
+def delete_user(
     user_id: int,
-    current_user: User = Depends(get_current_active_admin),
+    current_user: CurrentUser = Depends(get_current_active_admin),
     db: Session = Depends(get_db)
 ):
     user = db.query(User).filter(User.id == user_id).first()
@@ -776,39 +858,20 @@ async def delete_user(
     username = user.username
     db.delete(user)
     db.commit()
+    invalidate_user(username)
+    presence.forget(user_id)
     logger.info(f"[사용자 삭제 완료] 관리자: {current_user.username} | 삭제된 사용자: {username}")
     admin_logger = get_user_logger(current_user.username)
     admin_logger.info(f"[사용자 삭제] 삭제된 사용자: {username}")
     return {"message": "삭제 완료"}
 
 @app.post("/api/heartbeat")
-async def heartbeat(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    global _last_online_count
-
-    current_user.last_heartbeat = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9)))
-    db.commit()
-
-    threshold = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))) - datetime.timedelta(seconds=60)
-    online_users = db.query(User).filter(
-        User.last_heartbeat.isnot(None),
-        User.last_heartbeat >= threshold,
-        User.is_active == True
-    ).all()
-
-    count = len(online_users)
-
-    if _last_online_count is not None and _last_online_count != count:
-        logger.info(f"[접속자 수 변경] {_last_online_count}명 → {count}명")
-
-    _last_online_count = count
-
+async def heartbeat(current_user: CurrentUser = Depends(get_current_user)):
+    presence.touch(current_user)
     return {"status": "ok"}
 
 @app.post("/api/auth/logout")
-async def logout(current_user: User = Depends(get_current_user)):
+async def logout(current_user: CurrentUser = Depends(get_current_user)):
     logger.info(f"[로그아웃] 사용자: {current_user.username}")
     user_logger = get_user_logger(current_user.username)
     user_logger.info("[로그아웃]")
@@ -817,7 +880,7 @@ async def logout(current_user: User = Depends(get_current_user)):
 @app.post("/api/event")
 async def log_event(
     event: EventLog,
-    current_user: User = Depends(get_current_user)
+    current_user: CurrentUser = Depends(get_current_user)
 ):
     get_event_logger().info(f"[이벤트] 사용자: {current_user.username} | 동작: {event.action}")
     get_user_logger(current_user.username).info(f"[이벤트] 동작: {event.action}")
@@ -846,13 +909,13 @@ def _post_to_dict(post: Post) -> dict:
     }
 
 @app.get("/api/posts")
-async def get_posts(db: Session = Depends(get_db)):
+def get_posts(db: Session = Depends(get_db)):
     posts = db.query(Post).order_by(Post.created_at.desc()).all()
     logger.info(f"[게시글 목록 조회] 전체 게시글 수: {len(posts)}")
     return [_post_to_dict(p) for p in posts]
 
 @app.get("/api/posts/{post_id}")
-async def get_post(post_id: int, db: Session = Depends(get_db)):
+def get_post(post_id: int, db: Session = Depends(get_db)):
     post = db.query(Post).filter(Post.id == post_id).first()
     if not post:
         logger.warning(f"[게시글 조회 실패] 이유: 게시글 없음 (ID: {post_id})")
@@ -864,9 +927,9 @@ async def get_post(post_id: int, db: Session = Depends(get_db)):
     return _post_to_dict(post)
 
 @app.post("/api/posts", status_code=status.HTTP_201_CREATED)
-async def create_post(
+def create_post(
     post_data: PostCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     post = Post(
@@ -884,9 +947,9 @@ async def create_post(
     return _post_to_dict(post)
 
 @app.delete("/api/posts/{post_id}")
-async def delete_post(
+def delete_post(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     post = db.query(Post).filter(Post.id == post_id).first()
@@ -905,9 +968,9 @@ async def delete_post(
     return {"message": "삭제 완료"}
 
 @app.post("/api/posts/{post_id}/like")
-async def toggle_like(
+def toggle_like(
     post_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     post = db.query(Post).filter(Post.id == post_id).first()
@@ -922,10 +985,10 @@ async def toggle_like(
     return {"likes": post.likes}
 
 @app.post("/api/posts/{post_id}/comments", status_code=status.HTTP_201_CREATED)
-async def create_comment(
+def create_comment(
     post_id: int,
     comment_data: CommentCreate,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     post = db.query(Post).filter(Post.id == post_id).first()
@@ -952,90 +1015,198 @@ async def create_comment(
     }
 
 @app.post("/api/ai/chat")
-async def ai_chat(req: AiChatRequest, current_user: User = Depends(get_current_user)):
+async def ai_chat(req: AiChatRequest, current_user: CurrentUser = Depends(get_current_user)):
     import json as _json
-    global ai_processing
 
     logger.info(f"[AI 채팅] 사용자: {current_user.username} | 메시지: {req.message[:50]}{'...' if len(req.message) > 50 else ''}")
     user_logger = get_user_logger(current_user.username)
     user_logger.info(f"[AI 채팅] 메시지: {req.message[:50]}{'...' if len(req.message) > 50 else ''}")
 
-    my_event = asyncio.Event()
-    await ai_queue.put(my_event)
+    if req.conversation_id:
+        # 서버에 저장된 대화: 이력은 메모리 캐시(없으면 DB)에서 조립
+        async with db_session() as db:
+            history = await run_db(ai_conversations.get_history, db, req.conversation_id, current_user.id)
+        if history is None:
+            raise HTTPException(status_code=404, detail="대화를 찾을 수 없습니다")
+    else:
+        history = [m.model_dump() for m in req.history] if req.history else None
+    cache_key = ai_cache.make_key(req.message, history)
+
+    async def save_turn(contents: list):
+        if not req.conversation_id or not contents:
+            return
+        try:
+            async with db_session() as db:
+                await run_db(ai_conversations.append_turn, db, req.conversation_id, current_user.id, req.message, "".join(contents))
+        except Exception as e:
+            logger.error(f"[AI 대화 저장 실패] 사용자: {current_user.username} | 대화: {req.conversation_id} | 오류: {str(e)}")
 
     async def event_stream():
-        global ai_processing
+        cached = ai_cache.lookup(cache_key)
+        if cached is not None:
+            # 캐시 적중 시 대기열/모델을 거치지 않고 바로 재생
+            logger.info(f"[AI 캐시 적중] 사용자: {current_user.username}")
+            await save_turn(list(cached))
+            yield f"data: {_json.dumps({'type': 'processing'}, ensure_ascii=False)}\n\n"
+            async for chunk in ai_cache.replay(cached):
+                yield f"data: {_json.dumps(chunk, ensure_ascii=False)}\n\n"
+            return
+
+        # 응답이 시작된 뒤에 등록해야 연결이 끊겼을 때 finally에서 항상 반납됨
+        job = ai_scheduler.submit(current_user.id)
         try:
-            while True:
-                queue_list = list(ai_queue._queue)
-                position = queue_list.index(my_event) if my_event in queue_list else -1
-
-                if position == 0:
-                    async with ai_lock:
-                        if not ai_processing:
-                            ai_processing = True
-                            await ai_queue.get()
-                            break
-                    yield f"data: {_json.dumps({'type': 'queue', 'position': 1}, ensure_ascii=False)}\n\n"
-                elif position > 0:
-                    yield f"data: {_json.dumps({'type': 'queue', 'position': position}, ensure_ascii=False)}\n\n"
-
-                await asyncio.sleep(0.5)
+            async for position in ai_scheduler.wait(job):
+                yield f"data: {_json.dumps({'type': 'queue', 'position': position, 'capacity': ai_scheduler.slots}, ensure_ascii=False)}\n\n"
 
             yield f"data: {_json.dumps({'type': 'processing'}, ensure_ascii=False)}\n\n"
 
-            history = [m.model_dump() for m in req.history] if req.history else None
-            async for chunk in ai_engine.chat_stream(req.message, history):
+            contents = []
+            async for chunk in ai_stream.pipeline(ai_engine.chat_stream(req.message, history)):
+                if chunk["content"]:
+                    contents.append(chunk["content"])
+                if chunk["done"]:
+                    ai_cache.store(cache_key, contents)
+                    await save_turn(contents)
                 yield f"data: {_json.dumps(chunk, ensure_ascii=False)}\n\n"
         except Exception as e:
             logger.error(f"[AI 채팅 오류] 사용자: {current_user.username} | 오류: {str(e)}")
             yield f"data: {_json.dumps({'content': f'오류가 발생했습니다: {str(e)}', 'done': True}, ensure_ascii=False)}\n\n"
         finally:
-            ai_processing = False
+            ai_scheduler.release(job)
 
     return StreamingResponse(event_stream(), media_type="text/event-stream")
 
+@app.get("/api/ai/conversations", response_model=List[AiConversationResponse])
+def get_ai_conversations(current_user: CurrentUser = Depends(get_current_user), db: Session = Depends(get_db)):
+    return ai_conversations.list_conversations(db, current_user.id)
+
+@app.post("/api/ai/conversations", response_model=AiConversationResponse, status_code=status.HTTP_201_CREATED)
+def create_ai_conversation(
+    data: AiConversationCreate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    conversation = ai_conversations.create_conversation(db, current_user.id, data.title)
+    logger.info(f"[AI 대화 생성] 사용자: {current_user.username} | 대화: {conversation.id}")
+    return conversation
+
+@app.get("/api/ai/conversations/{conversation_id}/messages")
+def get_ai_conversation_messages(
+    conversation_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    messages = ai_conversations.get_messages(db, conversation_id, current_user.id)
+    if messages is None:
+        raise HTTPException(status_code=404, detail="대화를 찾을 수 없습니다")
+    return messages
+
+@app.delete("/api/ai/conversations/{conversation_id}")
+def delete_ai_conversation(
+    conversation_id: str,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    if not ai_conversations.delete_conversation(db, conversation_id, current_user.id):
+        raise HTTPException(status_code=404, detail="대화를 찾을 수 없습니다")
+    logger.info(f"[AI 대화 삭제] 사용자: {current_user.username} | 대화: {conversation_id}")
+    return {"success": True}
+
 @app.get("/api/ai/status")
-async def ai_status(current_user: User = Depends(get_current_user)):
+async def ai_status(current_user: CurrentUser = Depends(get_current_user)):
     result = await ai_engine.check_status()
-    logger.info(f"[AI 상태] 사용자: {current_user.username} | ollama: {result['ollama']} | 모델: {result['model_loaded']}")
+    logger.info(f"[AI 상태] 사용자: {current_user.username} | ollama: {result['ollama']} | 모델: {result['model_loaded']} | 한도: {result['capacity']}")
     return result
 
 @app.get("/api/admin/online-users")
-async def get_online_users(
-    db: Session = Depends(get_db),
-    current_user: User = Depends(get_current_active_admin)
-):
-    threshold = datetime.datetime.now(datetime.timezone(datetime.timedelta(hours=9))) - datetime.timedelta(seconds=60)
-
-    online_users = db.query(User).filter(
-        User.last_heartbeat.isnot(None),
-        User.last_heartbeat >= threshold,
-        User.is_active == True
-    ).all()
-
+async def get_online_users(current_user: CurrentUser = Depends(get_current_active_admin)):
+    online_users = presence.online_users()
     return {
         "count": len(online_users),
         "users": [
-            {
-                "id": u.id,
-                "username": u.username,
-                "name": u.name,
-                "role": u.role,
-                "last_heartbeat": u.last_heartbeat.isoformat() if u.last_heartbeat else None
-            }
+            {**u, "last_heartbeat": u["last_heartbeat"].isoformat()}
             for u in online_users
         ]
     }
 
+@app.get("/api/admin/online-users/stream")
+async def stream_online_users(request: Request, current_user: CurrentUser = Depends(get_current_active_admin)):
+    queue = presence.subscribe()
+    logger.info(f"[관리자] 접속자 스트림 구독: {current_user.username}")
+
+    async def event_stream():
+        try:
+            yield f"data: {encode_message(presence.snapshot())}\n\n"
+            while presence.is_subscribed(queue) or not queue.empty():
+                if await request.is_disconnected():
+                    break
+                try:
+                    event = await asyncio.wait_for(queue.get(), 15)
+                except asyncio.TimeoutError:
+                    yield ": ping\n\n"
+                    continue
+                yield f"data: {encode_message(event)}\n\n"
+        finally:
+            presence.unsubscribe(queue)
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+@app.get("/api/admin/stats")
+async def get_admin_stats(current_user: CurrentUser = Depends(get_current_active_admin)):
+    return {
+        "chat": chat_manager.get_stats(),
+        "db_pool": pool_status(),
+        "auth_user_cache": user_cache_stats(),
+        "password_hash": password_hash_stats(),
+        "ai_scheduler": ai_scheduler.stats(),
+        "ai_backends": [b.to_dict() for b in ai_engine.backends],
+        "ai_cache": ai_cache.stats(),
+        "ai_generation": ai_engine.metrics(),
+        "ai_stream": ai_stream.stats(),
+        "logging": log_stats(),
+        "event_loop": {k: v for k, v in loop_monitor.stats().items() if k != "recent"}
+    }
+
+@app.get("/api/admin/latency")
+async def get_latency(current_user: CurrentUser = Depends(get_current_active_admin)):
+    """라우트별 지연 p50/p95/p99 (p99가 큰 순)"""
+    return {"routes": metrics.latency_snapshot()}
+
+@app.delete("/api/admin/latency")
+async def reset_latency(current_user: CurrentUser = Depends(get_current_active_admin)):
+    metrics.reset_latency()
+    logger.info(f"[관리자] 지연 통계 초기화: {current_user.username}")
+    return {"success": True}
+
+@app.get("/api/admin/loop-monitor")
+async def get_loop_monitor(current_user: CurrentUser = Depends(get_current_active_admin)):
+    """이벤트 루프 감시 상태와 최근 정지 목록 (스택 포함)"""
+    return loop_monitor.stats()
+
+@app.put("/api/admin/loop-monitor")
+async def update_loop_monitor(data: LoopMonitorUpdate, current_user: CurrentUser = Depends(get_current_active_admin)):
+    if data.threshold_ms is not None:
+        loop_monitor.set_threshold(data.threshold_ms)
+    if data.enabled:
+        loop_monitor.enable()
+    else:
+        loop_monitor.disable()
+    logger.info(f"[관리자] 루프 감시 변경: {current_user.username} | 활성: {data.enabled} | 임계값: {loop_monitor.LOOP_STALL_THRESHOLD_MS:.0f}ms")
+    return loop_monitor.stats()
+
+@app.delete("/api/admin/ai/cache")
+async def purge_ai_cache(current_user: CurrentUser = Depends(get_current_active_admin)):
+    count = ai_cache.purge()
+    logger.info(f"[관리자] AI 응답 캐시 삭제: {current_user.username} | 삭제된 항목: {count}개")
+    return {"success": True, "purged": count}
+
 @app.get("/api/admin/users/pending", response_model=List[UserResponse])
-async def get_pending_users(db: Session = Depends(get_db), current_user: User = Depends(get_current_active_admin)):
+def get_pending_users(db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_active_admin)):
     users = db.query(User).filter(User.approval_status == "pending").all()
     logger.info(f"[관리자] 승인 대기 목록 조회: {current_user.username} | 대기 중: {len(users)}명")
     return users
 
-@app.post("/api/admin/users/{user_id}/approve")
-async def approve_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_admin)):
+def _approve_pending_user(db: Session, user_id: int) -> User:
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
@@ -1046,6 +1217,13 @@ async def approve_user(user_id: int, db: Session = Depends(get_db), current_user
     user.is_active = True
     user.approval_status = "approved"
     db.commit()
+    db.refresh(user)
+    invalidate_user(user.username)
+    return user
+
+@app.post("/api/admin/users/{user_id}/approve")
+async def approve_user(user_id: int, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_active_admin)):
+    user = await run_db(_approve_pending_user, db, user_id)
 
     try:
         await send_approval_email(user.email, user.name)
@@ -1056,7 +1234,7 @@ async def approve_user(user_id: int, db: Session = Depends(get_db), current_user
     return {"success": True}
 
 @app.post("/api/admin/users/{user_id}/reject")
-async def reject_user(user_id: int, db: Session = Depends(get_db), current_user: User = Depends(get_current_active_admin)):
+def reject_user(user_id: int, db: Session = Depends(get_db), current_user: CurrentUser = Depends(get_current_active_admin)):
     user = db.query(User).filter(User.id == user_id).first()
     if not user:
         raise HTTPException(status_code=404, detail="사용자를 찾을 수 없습니다")
@@ -1066,47 +1244,19 @@ async def reject_user(user_id: int, db: Session = Depends(get_db), current_user:
 
     db.delete(user)
     db.commit()
+    invalidate_user(user.username)
 
     logger.info(f"[관리자] 회원가입 거절: {current_user.username} → {user.username}")
     return {"success": True}
 
-@app.get("/api/admin/online-users")
-async def get_online_users(
-    current_user: User = Depends(get_current_active_admin),
-    db: Session = Depends(get_db)
-):
-    kst = datetime.timezone(datetime.timedelta(hours=9))
-    cutoff_time = datetime.datetime.now(kst) - datetime.timedelta(minutes=5)
-
-    online_users = db.query(User).filter(
-        User.last_heartbeat != None,
-        User.last_heartbeat >= cutoff_time
-    ).all()
-
-    logger.info(f"[관리자] 접속자 목록 조회: {current_user.username} | 접속자 수: {len(online_users)}")
-
-    return {
-        "count": len(online_users),
-        "users": [
-            {
-                "id": u.id,
-                "username": u.username,
-                "name": u.name,
-                "role": u.role,
-                "last_heartbeat": u.last_heartbeat
-            }
-            for u in online_users
-        ]
-    }
-
 @app.get("/api/inventory", response_model=List[InventoryResponse])
-async def get_inventory(db: Session = Depends(get_db)):
+def get_inventory(db: Session = Depends(get_db)):
     items = db.query(Inventory).order_by(Inventory.created_at.desc()).all()
     logger.info(f"[재고 목록 조회] 전체 재고 수: {len(items)}")
     return items
 
 @app.get("/api/inventory/{item_id}", response_model=InventoryResponse)
-async def get_inventory_item(item_id: int, db: Session = Depends(get_db)):
+def get_inventory_item(item_id: int, db: Session = Depends(get_db)):
     item = db.query(Inventory).filter(Inventory.id == item_id).first()
     if not item:
         logger.warning(f"[재고 조회 실패] 이유: 재고 없음 (ID: {item_id})")
@@ -1115,7 +1265,7 @@ async def get_inventory_item(item_id: int, db: Session = Depends(get_db)):
     return item
 
 @app.post("/api/inventory", response_model=InventoryResponse, status_code=status.HTTP_201_CREATED)
-async def create_inventory(
+def create_inventory(
     item_data: InventoryCreate,
     db: Session = Depends(get_db)
 ):
@@ -1133,7 +1283,7 @@ async def create_inventory(
     return item
 
 @app.put("/api/inventory/{item_id}", response_model=InventoryResponse)
-async def update_inventory(
+def update_inventory(
     item_id: int,
     item_data: InventoryUpdate,
     db: Session = Depends(get_db)
@@ -1151,7 +1301,7 @@ async def update_inventory(
     return item
 
 @app.delete("/api/inventory/{item_id}")
-async def delete_inventory(
+def delete_inventory(
     item_id: int,
     db: Session = Depends(get_db)
 ):
@@ -1166,18 +1316,10 @@ async def delete_inventory(
     return {"message": "삭제 완료"}
 
 @app.websocket("/ws/chat")
-async def websocket_chat_endpoint(websocket: WebSocket, db: Session = Depends(get_db)):
-    await chat_websocket.handle_websocket_chat(websocket, db)
-
-@app.post("/api/chat/rooms")
-async def create_chat_room(
-    room_data: ChatRoomCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    member_ids = set(room_data.member_ids or [])
-    member_ids.add(current_user.id)
+async def websocket_chat_endpoint(websocket: WebSocket):
+    await chat_websocket.handle_websocket_chat(websocket)
 
+def _find_or_create_room(db: Session, room_data: ChatRoomCreate, current_user_id: int, member_ids: set) -> ChatRoom:
     # 멤버 존재 확인
     for uid in member_ids:
         user = db.query(User).filter(User.id == uid).first()
@@ -1207,34 +1349,11 @@ async def create_chat_room(
 
             if existing_member_ids == member_ids:
                 logger.info(f"[채팅방 중복] 기존 방 반환: {existing_room.id}")
-
-                # 기존 방도 브로드캐스트
-                await chat_manager.broadcast_to_users(
-                    list(member_ids),
-                    {
-                        "type": "room_created",
-                        "data": {
-                            "id": existing_room.id,
-                            "name": existing_room.name,
-                            "type": existing_room.type,
-                            "members": list(member_ids),
-                            "last_message": None,
-                            "unread_count": 0,
-                            "created_at": existing_room.created_at.isoformat()
-                        }
-                    }
-                )
-
-                return {
-                    "id": existing_room.id,
-                    "name": existing_room.name,
-                    "type": existing_room.type,
-                    "members": list(member_ids)
-                }
+                return existing_room
 
         # 1:1 대화 이름 = 상대방 이름
         if not room_data.name:
-            other_user_id = (member_ids - {current_user.id}).pop()
+            other_user_id = (member_ids - {current_user_id}).pop()
             other_user = db.query(User).filter(User.id == other_user_id).first()
             room_name = other_user.name
         else:
@@ -1259,8 +1378,20 @@ async def create_chat_room(
     db.commit()
     db.refresh(room)
     logger.info(f"[채팅방 생성] ID: {room.id} | 이름: {room.name} | 타입: {room.type} | 멤버: {len(member_ids)}명")
+    return room
 
-    # WebSocket 브로드캐스트
+@app.post("/api/chat/rooms")
+async def create_chat_room(
+    room_data: ChatRoomCreate,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    member_ids = set(room_data.member_ids or [])
+    member_ids.add(current_user.id)
+
+    room = await run_db(_find_or_create_room, db, room_data, current_user.id, member_ids)
+
+    # WebSocket 브로드캐스트 (기존 방도 브로드캐스트)
     await chat_manager.broadcast_to_users(
         list(member_ids),
         {
@@ -1279,53 +1410,34 @@ async def create_chat_room(
 
     return {"id": room.id, "name": room.name, "type": room.type, "members": list(member_ids)}
 
-@app.get("/api/chat/rooms")
-async def get_chat_rooms(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
-):
-    rooms = db.query(ChatRoom).join(ChatRoomMember).filter(
-        ChatRoomMember.user_id == current_user.id
-    ).order_by(ChatRoom.updated_at.desc()).all()
-
-    result = []
-    for room in rooms:
-        last_msg = db.query(ChatMessage).filter(
-            ChatMessage.room_id == room.id
-        ).order_by(ChatMessage.created_at.desc()).first()
-
-        member = db.query(ChatRoomMember).filter(
-            ChatRoomMember.room_id == room.id,
-            ChatRoomMember.user_id == current_user.id
-        ).first()
-
-        unread_count = db.query(ChatMessage).filter(
-            ChatMessage.room_id == room.id,
-            ChatMessage.id > (member.last_read_id or 0)
-        ).count()
+def _get_room_member(db: Session, room_id: str, user_id: int) -> Optional[ChatRoomMember]:
+    return db.query(ChatRoomMember).filter(
+        ChatRoomMember.room_id == room_id,
+        ChatRoomMember.user_id == user_id
+    ).first()
 
-        members = db.query(User).join(ChatRoomMember).filter(
-            ChatRoomMember.room_id == room.id
-        ).all()
+def _save_and_commit(db: Session, obj):
+    db.add(obj)
+    db.commit()
 
-        result.append({
-            "id": room.id,
-            "name": room.name,
-            "type": room.type,
-            "members": [{"id": m.id, "name": m.name} for m in members],
-            "last_message": last_msg.content[:50] if last_msg else None,
-            "unread_count": unread_count,
-            "updated_at": room.updated_at
-        })
+def _save_and_refresh(db: Session, obj):
+    db.add(obj)
+    db.commit()
+    db.refresh(obj)
 
-    return result
+@app.get("/api/chat/rooms")
+def get_chat_rooms(
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return get_room_list(db, current_user.id)
 
 @app.get("/api/chat/rooms/{room_id}/messages")
-async def get_messages(
+def get_messages(
     room_id: str,
     before: Optional[int] = None,
     limit: int = 50,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     member = db.query(ChatRoomMember).filter(
@@ -1343,7 +1455,7 @@ async def get_messages(
     if before:
         query = query.filter(ChatMessage.id < before)
 
-    messages = query.order_by(ChatMessage.created_at.desc()).limit(limit).all()
+    messages = query.order_by(ChatMessage.id.desc()).limit(limit).all()
     messages.reverse()
 
     result = []
@@ -1363,17 +1475,31 @@ async def get_messages(
 
     return result
 
+@app.get("/api/chat/rooms/{room_id}/history")
+def get_message_history(
+    room_id: str,
+    cursor: Optional[str] = None,
+    limit: int = chat_history.CHAT_HISTORY_DEFAULT_LIMIT,
+    current_user: CurrentUser = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """커서 기반 메시지 이력 (next_cursor로 이전 페이지 요청, 읽음 상태는 멤버별 last_read_id)"""
+    try:
+        history = chat_history.get_history(db, room_id, current_user.id, cursor, limit)
+    except ValueError:
+        raise HTTPException(400, "잘못된 커서")
+    if history is None:
+        raise HTTPException(403, "채팅방 접근 권한 없음")
+    return history
+
 @app.post("/api/chat/upload")
 async def upload_file(
     file: UploadFile = File(...),
     room_id: str = Form(...),
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    member = db.query(ChatRoomMember).filter(
-        ChatRoomMember.room_id == room_id,
-        ChatRoomMember.user_id == current_user.id
-    ).first()
+    member = await run_db(_get_room_member, db, room_id, current_user.id)
     if not member:
         raise HTTPException(403, "권한 없음")
 
@@ -1399,16 +1525,15 @@ async def upload_file(
         path=file_path,
         thumbnail_path=thumbnail_path
     )
-    db.add(chat_file)
-    db.commit()
+    await run_db(_save_and_commit, db, chat_file)
 
     return {"file_id": file_id, "filename": file.filename, "thumbnail": thumbnail_path}
 
 @app.get("/api/chat/files/{file_id}")
-async def download_file(
+def download_file(
     file_id: str,
     thumbnail: bool = False,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     chat_file = db.query(ChatFile).filter(ChatFile.id == file_id).first()
@@ -1432,9 +1557,9 @@ async def download_file(
     return FileResponse(file_path, media_type=chat_file.mime_type, filename=chat_file.filename)
 
 @app.get("/api/chat/sync")
-async def sync_messages(
+def sync_messages(
     last_id: int,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     room_ids = db.query(ChatRoomMember.room_id).filter(
@@ -1470,30 +1595,13 @@ async def sync_messages(
 @app.post("/api/chat/read")
 async def mark_as_read(
     read_data: ChatReadRequest,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    member = db.query(ChatRoomMember).filter(
-        ChatRoomMember.room_id == read_data.room_id,
-        ChatRoomMember.user_id == current_user.id
-    ).first()
-    if not member:
+    saved = await run_db(chat_manager.save_read_receipts, db, read_data.room_id, current_user.id, read_data.message_ids)
+    if not saved:
         raise HTTPException(403, "권한 없음")
 
-    max_id = max(read_data.message_ids)
-    if not member.last_read_id or max_id > member.last_read_id:
-        member.last_read_id = max_id
-
-    for msg_id in read_data.message_ids:
-        existing = db.query(ChatReadReceipt).filter(
-            ChatReadReceipt.message_id == msg_id,
-            ChatReadReceipt.user_id == current_user.id
-        ).first()
-        if not existing:
-            db.add(ChatReadReceipt(message_id=msg_id, user_id=current_user.id))
-
-    db.commit()
-
     await chat_manager.broadcast_read_receipt(read_data.room_id, {
         "user_id": current_user.id,
         "message_ids": read_data.message_ids
@@ -1502,10 +1610,10 @@ async def mark_as_read(
     return {"success": True}
 
 @app.get("/api/chat/search")
-async def search_messages(
+def search_messages(
     q: str,
     room_id: Optional[str] = None,
-    current_user: User = Depends(get_current_user),
+    current_user: CurrentUser = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
     room_ids = db.query(ChatRoomMember.room_id).filter(
@@ -1546,6 +1654,12 @@ if __name__ == "__main__":
     uvicorn_access.handlers.clear()
     uvicorn_access.disabled = True
 
+    # OTP 저장소, AI 스케줄러 슬롯, 인증/AI 대화 캐시, presence가 아직 프로세스별이라 워커는 1개로 고정
+    # (CHAT_BROADCAST_BACKEND=postgres는 별도 인스턴스 간 채팅 전달용)
+    workers = 1
+    if int(os.getenv("UVICORN_WORKERS", "1")) > 1:
+        logger.warning("UVICORN_WORKERS > 1은 지원하지 않음 (프로세스별 상태 공유 전까지) - 워커 1개로 실행")
+
     cert_file = os.path.join(os.path.dirname(__file__), "certs", "cert.pem")
     key_file = os.path.join(os.path.dirname(__file__), "certs", "key.pem")
 
@@ -1555,7 +1669,7 @@ if __name__ == "__main__":
             "main:app",
             host="0.0.0.0",
             port=8000,
-            workers=1,
+            workers=workers,
             limit_concurrency=400,
             log_level="critical",
             ssl_keyfile=key_file,
@@ -1568,7 +1682,7 @@ if __name__ == "__main__":
             "main:app",
             host="0.0.0.0",
             port=8000,
-            workers=1,
+            workers=workers,
             limit_concurrency=400,
             log_level="critical"
         )
@@ -0,0 +1,191 @@
+import bisect
+import threading
+
+# 프로세스 내 지연 히스토그램 (고정 버킷, 라우트 템플릿 단위라 메모리는 라우트 수에 비례)
+LATENCY_BUCKETS_MS = (1, 2.5, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+# /metrics(Prometheus 텍스트 형식)용 기본 버킷 (초 단위)
+SECONDS_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+class Histogram:
+    """고정 버킷 히스토그램, 백분위는 버킷 안에서 선형 보간으로 추정"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS_MS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            if n and seen + n >= rank:
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / n, self.max)
+            seen += n
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count, 2) if self.count else 0,
+            "p50_ms": round(self.percentile(0.50), 2),
+            "p95_ms": round(self.percentile(0.95), 2),
+            "p99_ms": round(self.percentile(0.99), 2),
+            "max_ms": round(self.max, 2)
+        }
+
+_routes = {}
+_errors = {}
+_lock = threading.Lock()
+
+def observe_request(method: str, route: str, status_code: int, duration_ms: float):
+    key = f"{method} {route}"
+    with _lock:
+        histogram = _routes.get(key)
+        if histogram is None:
+            histogram = _routes[key] = Histogram()
+        histogram.observe(duration_ms)
+        if status_code >= 500:
+            _errors[key] = _errors.get(key, 0) + 1
+
+def latency_snapshot() -> list:
+    """라우트별 지연 요약 (p99가 큰 순)"""
+    with _lock:
+        rows = [
+            {"route": key, **histogram.summary(), "errors": _errors.get(key, 0)}
+            for key, histogram in _routes.items()
+        ]
+    rows.sort(key=lambda r: r["p99_ms"], reverse=True)
+    return rows
+
+def reset_latency():
+    with _lock:
+        _routes.clear()
+        _errors.clear()
+
+# ===== Prometheus 텍스트 형식 =====
+# 계측 지점에서는 값만 더하고 (락 1회), 게이지는 수집 시점에 콜백으로 읽음
+
+_registry = []
+
+def _format_labels(labelnames: tuple, labels: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(labelnames, labels)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_value(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Counter:
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def inc(self, amount: float = 1, labels: tuple = ()):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> list:
+        with self._lock:
+            values = list(self._values.items())
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+class Gauge:
+    """수집 시점에 func() 호출, 숫자 또는 {라벨 튜플: 값} 반환"""
+
+    def __init__(self, name: str, help: str, func, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.func = func
+        self.labelnames = labelnames
+        _registry.append(self)
+
+    def collect(self) -> list:
+        value = self.func()
+        values = value.items() if isinstance(value, dict) else [((), value)]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        for labels, v in values:
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}")
+        return lines
+
+class HistogramMetric:
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(buckets)
+        self._histograms = {}
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def observe(self, value: float, labels: tuple = ()):
+        with self._lock:
+            histogram = self._histograms.get(labels)
+            if histogram is None:
+                histogram = self._histograms[labels] = Histogram(self.buckets)
+            histogram.observe(value)
+
+    def collect(self) -> list:
+        with self._lock:
+            items = [(labels, list(h.counts), h.count, h.sum) for labels, h in self._histograms.items()]
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, counts, count, total in items:
+            lines.extend(_histogram_lines(self.name, self.labelnames, labels, self.buckets, counts, count, total))
+        return lines
+
+def _histogram_lines(name, labelnames, labels, buckets, counts, count, total, scale: float = 1) -> list:
+    lines = []
+    cumulative = 0
+    for bound, n in zip(buckets, counts):
+        cumulative += n
+        le = 'le="%s"' % _format_value(round(bound * scale, 6))
+        lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {cumulative}")
+    le = 'le="+Inf"'
+    lines.append(f"{name}_bucket{_format_labels(labelnames, labels, le)} {count}")
+    lines.append(f"{name}_sum{_format_labels(labelnames, labels)} {_format_value(total * scale)}")
+    lines.append(f"{name}_count{_format_labels(labelnames, labels)} {count}")
+    return lines
+
+def _http_lines() -> list:
+    """라우트별 지연 히스토그램(ms)을 초 단위로 변환해 출력"""
+    name = "dongin_http_request_duration_seconds"
+    with _lock:
+        items = [(key.split(" ", 1), list(h.counts), h.count, h.sum) for key, h in _routes.items()]
+        errors = list(_errors.items())
+    lines = [f"# HELP {name} HTTP 요청 처리 시간", f"# TYPE {name} histogram"]
+    for labels, counts, count, total in items:
+        lines.extend(_histogram_lines(name, ("method", "route"), tuple(labels), LATENCY_BUCKETS_MS, counts, count, total, 0.001))
+    lines += ["# HELP dongin_http_errors_total HTTP 5xx 응답 수", "# TYPE dongin_http_errors_total counter"]
+    for key, n in errors:
+        lines.append(f"dongin_http_errors_total{_format_labels(('method', 'route'), tuple(key.split(' ', 1)))} {n}")
+    return lines
+
+def render() -> str:
+    """등록된 모든 지표를 Prometheus 텍스트 형식으로"""
+    lines = _http_lines()
+    for metric in _registry:
+        lines.extend(metric.collect())
+    return "\n".join(lines) + "\n"
@@ -83,10 +83,20 @@ class ChatRoomMember(Base):
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
     joined_at = Column(DateTime(timezone=True), server_default=func.now())
     last_read_id = Column(BigInteger, nullable=True)
+    read_offset = Column(BigInteger, default=0, nullable=False)
 
     room = relationship("ChatRoom", back_populates="members")
     user = relationship("User")
 
+class ChatRoomSummary(Base):
+    __tablename__ = "chat_room_summaries"
+
+    room_id = Column(String(36), ForeignKey("chat_rooms.id", ondelete="CASCADE"), primary_key=True)
+    last_message_id = Column(BigInteger, nullable=True)
+    last_message_preview = Column(String(50), nullable=True)
+    last_message_at = Column(DateTime(timezone=True), nullable=True)
+    message_count = Column(BigInteger, default=0, nullable=False)
+
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
 
@@ -106,6 +116,7 @@ class ChatMessage(Base):
 
     __table_args__ = (
         Index('idx_room_created', 'room_id', 'created_at'),
+        Index('idx_room_id', 'room_id', 'id'),
     )
 
 class ChatFile(Base):
@@ -131,3 +142,25 @@ class ChatReadReceipt(Base):
 
     message = relationship("ChatMessage", back_populates="read_receipts")
     user = relationship("User")
+
+class AiConversation(Base):
+    __tablename__ = "ai_conversations"
+
+    id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False, index=True)
+    title = Column(String(100), nullable=False, default="새 대화")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    messages = relationship("AiMessage", back_populates="conversation", cascade="all, delete-orphan", order_by="AiMessage.id")
+
+class AiMessage(Base):
+    __tablename__ = "ai_messages"
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+    conversation_id = Column(String(36), ForeignKey("ai_conversations.id", ondelete="CASCADE"), nullable=False, index=True)
+    role = Column(String(10), nullable=False)
+    content = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    conversation = relationship("AiConversation", back_populates="messages")
@@ -0,0 +1,236 @@
+import asyncio
+import datetime
+import os
+import threading
+import time
+from sqlalchemy import bindparam, update
+from database import db_session, run_db
+from models import User
+from logger import logger
+
+# heartbeat는 메모리에만 기록하고 users.last_heartbeat에는 주기적으로 일괄 반영
+PRESENCE_TTL = int(os.getenv("PRESENCE_TTL", "60"))
+PRESENCE_FLUSH_INTERVAL = float(os.getenv("PRESENCE_FLUSH_INTERVAL", "30"))
+# 다중 워커: 각 워커의 flush 결과를 DB에서 읽어 병합 (최대 FLUSH_INTERVAL 만큼 지연)
+PRESENCE_SHARED = os.getenv("PRESENCE_SHARED", "false").lower() == "true"
+# TTL 만료/비활성화 반영 주기 (접속/해제는 즉시 전송)
+PRESENCE_SWEEP_INTERVAL = float(os.getenv("PRESENCE_SWEEP_INTERVAL", "1"))
+# 대시보드의 마지막 활동 시각 갱신 주기 (join 이후에도 시각이 멈춰 보이지 않도록)
+PRESENCE_SEEN_INTERVAL = float(os.getenv("PRESENCE_SEEN_INTERVAL", "30"))
+SUBSCRIBER_QUEUE_SIZE = 256
+
+KST = datetime.timezone(datetime.timedelta(hours=9))
+
+_last_seen = {}
+_users = {}
+_sockets = {}
+_dirty = set()
+_remote = {}
+_online = {}
+_subscribers = set()
+_flush_task = None
+_sweep_task = None
+_seen_published = 0.0
+# forget()은 동기 라우트(스레드풀)에서도 호출됨
+_lock = threading.Lock()
+
+def _now() -> datetime.datetime:
+    return datetime.datetime.now(KST)
+
+def _threshold() -> datetime.datetime:
+    return _now() - datetime.timedelta(seconds=PRESENCE_TTL)
+
+def touch(user):
+    """heartbeat 수신 시 마지막 접속 시각 갱신 (DB 접근 없음)"""
+    with _lock:
+        _last_seen[user.id] = _now()
+        _remember(user)
+        _dirty.add(user.id)
+    _sync()
+
+def _remember(user):
+    _users[user.id] = {"id": user.id, "username": user.username, "name": user.name, "role": user.role}
+
+def connect(user):
+    """WebSocket 연결 시 접속 처리 (소켓이 열려 있는 동안 heartbeat 없이도 접속 상태)"""
+    with _lock:
+        _sockets[user.id] = _sockets.get(user.id, 0) + 1
+        _remember(user)
+    _sync()
+
+def disconnect(user_id: int):
+    """마지막 WebSocket 종료 시 heartbeat가 없으면 바로 퇴장 처리"""
+    with _lock:
+        count = _sockets.get(user_id, 0) - 1
+        if count > 0:
+            _sockets[user_id] = count
+        else:
+            _sockets.pop(user_id, None)
+    _sync()
+
+def forget(user_id: int):
+    """비활성화/삭제된 사용자를 접속자 목록에서 제거"""
+    with _lock:
+        _last_seen.pop(user_id, None)
+        _users.pop(user_id, None)
+        _sockets.pop(user_id, None)
+        _dirty.discard(user_id)
+        _remote.pop(user_id, None)
+
+def online_users() -> list:
+    """WebSocket 연결 중이거나 TTL 이내에 heartbeat를 보낸 사용자 목록"""
+    now = _now()
+    threshold = _threshold()
+    result = {}
+    with _lock:
+        for user_id, info in _remote.items():
+            if info["last_heartbeat"] >= threshold:
+                result[user_id] = info
+        for user_id, seen in _last_seen.items():
+            if seen >= threshold and (user_id not in result or result[user_id]["last_heartbeat"] < seen):
+                result[user_id] = {**_users[user_id], "last_heartbeat": seen}
+        for user_id in _sockets:
+            if user_id in _users:
+                result[user_id] = {**_users[user_id], "last_heartbeat": now}
+    return sorted(result.values(), key=lambda u: u["last_heartbeat"], reverse=True)
+
+def online_count() -> int:
+    return len(online_users())
+
+def _sync():
+    """이전 접속자 목록과 비교해 join/leave 이벤트 전송"""
+    global _online
+    current = {u["id"]: u for u in online_users()}
+    joined = [current[uid] for uid in current.keys() - _online.keys()]
+    left = list(_online.keys() - current.keys())
+    if not joined and not left:
+        _online = current
+        return
+
+    logger.info(f"[접속자 수 변경] {len(_online)}명 → {len(current)}명")
+    _online = current
+    for user in joined:
+        _publish({"type": "join", "user": _serialize(user), "count": len(current)})
+    for user_id in left:
+        _publish({"type": "leave", "user_id": user_id, "count": len(current)})
+
+def _serialize(user: dict) -> dict:
+    return {**user, "last_heartbeat": user["last_heartbeat"].isoformat()}
+
+def _publish(event: dict):
+    for queue in list(_subscribers):
+        try:
+            queue.put_nowait(event)
+        except asyncio.QueueFull:
+            # 따라오지 못하는 구독자는 끊고, 재연결 시 snapshot부터 다시 받게 함
+            _subscribers.discard(queue)
+
+def snapshot() -> dict:
+    users = online_users()
+    return {"type": "snapshot", "count": len(users), "users": [_serialize(u) for u in users]}
+
+def subscribe() -> asyncio.Queue:
+    """접속 상태 변경 이벤트 구독 (관리자 대시보드용)"""
+    queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+    _subscribers.add(queue)
+    return queue
+
+def unsubscribe(queue: asyncio.Queue):
+    _subscribers.discard(queue)
+
+def is_subscribed(queue: asyncio.Queue) -> bool:
+    return queue in _subscribers
+
+def _prune():
+    threshold = _threshold()
+    with _lock:
+        for user_id in [uid for uid, seen in _last_seen.items() if seen < threshold and uid not in _dirty and uid not in _sockets]:
+            del _last_seen[user_id]
+            _users.pop(user_id, None)
+
+def _write_batch(db, updates: list):
+    if updates:
+        # 삭제된 사용자가 섞여 있어도 실패하지 않도록 Core executemany 사용
+        db.execute(
+            update(User.__table__).where(User.__table__.c.id == bindparam("uid")).values(last_heartbeat=bindparam("seen")),
+            updates
+        )
+        db.commit()
+
+    if not PRESENCE_SHARED:
+        return None
+    rows = db.query(User.id, User.username, User.name, User.role, User.last_heartbeat).filter(
+        User.last_heartbeat.isnot(None),
+        User.last_heartbeat >= _threshold(),
+        User.is_active == True
+    ).all()
+    return {
+        r.id: {"id": r.id, "username": r.username, "name": r.name, "role": r.role, "last_heartbeat": r.last_heartbeat}
+        for r in rows
+    }
+
+async def flush():
+    """변경된 last_heartbeat를 한 번의 트랜잭션으로 DB에 반영"""
+    global _remote
+    now = _now()
+    with _lock:
+        user_ids = set(_dirty)
+        _dirty.clear()
+        updates = [{"uid": uid, "seen": _last_seen[uid]} for uid in user_ids if uid in _last_seen]
+        # 소켓으로 접속 중인 사용자도 다른 워커에서 보이도록 last_heartbeat 갱신
+        updates += [{"uid": uid, "seen": now} for uid in _sockets if uid not in user_ids]
+
+    try:
+        async with db_session() as db:
+            remote = await run_db(_write_batch, db, updates)
+    except Exception:
+        with _lock:
+            _dirty.update(uid for uid in user_ids if uid in _last_seen)
+        raise
+
+    if remote is not None:
+        with _lock:
+            _remote = remote
+    _prune()
+    _sync()
+
+def _publish_seen():
+    """접속 중인 사용자의 마지막 활동 시각을 구독자에게 일괄 전송"""
+    global _seen_published
+    _seen_published = time.monotonic()
+    if _subscribers and _online:
+        _publish({
+            "type": "seen",
+            "users": [{"id": u["id"], "last_heartbeat": u["last_heartbeat"].isoformat()} for u in _online.values()]
+        })
+
+async def _sweep_loop():
+    while True:
+        await asyncio.sleep(PRESENCE_SWEEP_INTERVAL)
+        _sync()
+        if time.monotonic() - _seen_published >= PRESENCE_SEEN_INTERVAL:
+            _publish_seen()
+
+async def _flush_loop():
+    while True:
+        await asyncio.sleep(PRESENCE_FLUSH_INTERVAL)
+        try:
+            await flush()
+        except Exception as e:
+            logger.error(f"[접속 상태] DB 반영 실패 | {e}")
+
+async def start():
+    global _flush_task, _sweep_task
+    _flush_task = asyncio.create_task(_flush_loop())
+    _sweep_task = asyncio.create_task(_sweep_loop())
+    logger.info(f"[접속 상태] 시작 | TTL: {PRESENCE_TTL}초 | 반영 주기: {PRESENCE_FLUSH_INTERVAL}초 | 공유: {PRESENCE_SHARED}")
+
+async def stop():
+    """종료 전 남은 변경분 반영"""
+    for task in (_flush_task, _sweep_task):
+        if task:
+            task.cancel()
+    try:
+        await flush()
+    except Exception as e:
+        logger.error(f"[접속 상태] 종료 시 DB 반영 실패 | {e}")
@@ -0,0 +1,22 @@
+from sqlalchemy import text
+from database import SessionLocal, Base, engine
+from chat_rooms import rebuild_summaries
+
+print("="*50)
+print("채팅방 요약(chat_room_summaries) 재생성")
+print("="*50)
+
+Base.metadata.create_all(bind=engine)
+with engine.begin() as conn:
+    conn.execute(text("ALTER TABLE chat_room_members ADD COLUMN IF NOT EXISTS read_offset BIGINT DEFAULT 0 NOT NULL"))
+
+db = SessionLocal()
+try:
+    room_count = rebuild_summaries(db)
+finally:
+    db.close()
+
+print(f"\n✓ 재생성 완료")
+print(f"  - 요약 생성된 채팅방: {room_count}개")
+print(f"  - 멤버 읽음 오프셋(read_offset) 재계산 완료")
+print("="*50)
@@ -9,8 +9,21 @@ class AiChatMessage(BaseModel):
 
 class AiChatRequest(BaseModel):
     message: str = Field(..., min_length=1)
+    conversation_id: str | None = None
     history: list[AiChatMessage] | None = None
 
+class AiConversationCreate(BaseModel):
+    title: Optional[str] = Field(None, max_length=100)
+
+class AiConversationResponse(BaseModel):
+    id: str
+    title: str
+    created_at: datetime
+    updated_at: datetime
+
+    class Config:
+        from_attributes = True
+
 class UserBase(BaseModel):
     username: str = Field(..., min_length=3, max_length=50)
     name: str = Field(..., min_length=1, max_length=100)
@@ -165,6 +178,10 @@ class FileUploadResponse(BaseModel):
     filename: str
     thumbnail: Optional[str]
 
+class LoopMonitorUpdate(BaseModel):
+    enabled: bool
+    threshold_ms: Optional[float] = Field(None, gt=0)
+
 class UserSearchResponse(BaseModel):
     id: int
     name: str
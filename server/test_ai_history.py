@@ -0,0 +1,40 @@
+import ai_engine
+
+# compact_history: 예산 초과 후에도 잘린 앞부분(prefix)이 여러 턴 동안 유지되는지 확인
+# 사용법: python -m pytest test_ai_history.py
+
+def _turn(content: str) -> list:
+    return [{"role": "user", "content": content}, {"role": "assistant", "content": content}]
+
+def _simulate(monkeypatch, budget: int, content: str, turns: int = 40) -> tuple:
+    """매 요청마다 이전 질문/응답을 이력에 더하며 (제거 수, 남은 이력) 기록"""
+    monkeypatch.setattr(ai_engine, "AI_HISTORY_TOKEN_BUDGET", budget)
+    monkeypatch.setattr(ai_engine, "SYSTEM_PROMPT", "시스템")
+    history, results = [], []
+    for _ in range(turns):
+        results.append(ai_engine.compact_history(history, "질문"))
+        history = history + _turn(content)
+    return results, history
+
+def test_prefix_stable_between_requests(monkeypatch):
+    results, _ = _simulate(monkeypatch, 300, "a" * 60)
+    dropped = [d for _, d in results]
+    assert max(dropped) > 0
+    # 잘리는 위치가 바뀐 뒤 다음 요청에서는 같은 위치 유지
+    changes = [i for i in range(1, len(dropped)) if dropped[i] != dropped[i - 1]]
+    assert all(b - a >= 2 for a, b in zip(changes, changes[1:]))
+    for (prev, prev_dropped), (cur, cur_dropped) in zip(results, results[1:]):
+        if prev_dropped == cur_dropped:
+            assert cur[:len(prev)] == prev
+
+def test_keeps_latest_turn_and_starts_with_user(monkeypatch):
+    results, _ = _simulate(monkeypatch, 3000, "가" * 1000, turns=10)
+    for i, (kept, _) in enumerate(results):
+        if i:
+            assert kept and kept[0]["role"] == "user"
+            assert kept[-2:] == _turn("가" * 1000)
+
+def test_under_budget_untouched(monkeypatch):
+    monkeypatch.setattr(ai_engine, "AI_HISTORY_TOKEN_BUDGET", 3000)
+    history = _turn("hello") * 3
+    assert ai_engine.compact_history(history, "질문") == (history, 0)